@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+This script benchmarks the import time of the personal_data modules and
+ guards their lazy imports: it fails when importing a module loads one
+  of the heavy dependencies that should only load on first use, or when
+   the import takes longer than an optional budget.
+"""
+
+from typing import Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ('filtered_logger', 'encrypt_password', 'pii_registry',
+           'redact_logs')
+HEAVY_MODULES = ('mysql', 'bcrypt', 'sqlite3', 'multiprocessing',
+                 'concurrent.futures.process')
+PROBE = ("import json, sys\n"
+         "import {module}\n"
+         "heavy = {heavy!r}\n"
+         "print(json.dumps(sorted(name for name in sys.modules\n"
+         "                        if name.split('.')[0] in heavy\n"
+         "                        or name in heavy)))\n")
+
+
+def measure_import(module: str) -> Dict:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module (str): Name of the module.
+
+    Returns:
+        Dict: The cumulative import time in microseconds and the heavy
+         modules loaded by the import.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=directory, capture_output=True, text=True,
+                            check=True)
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    return {'import_us': cumulative,
+            'heavy_modules': json.loads(result.stdout)}
+
+
+def run(modules: List[str], repeat: int) -> Dict:
+    """
+    Measure every module `repeat` times.
+
+    Args:
+        modules (List[str]): Names of the modules.
+        repeat (int): Number of fresh interpreters per module.
+
+    Returns:
+        Dict: The report.
+    """
+    results = []
+    for module in modules:
+        runs = [measure_import(module) for _ in range(repeat)]
+        results.append({
+            'module': module,
+            'import_us_median': statistics.median(run['import_us']
+                                                  for run in runs),
+            'import_us_min': min(run['import_us'] for run in runs),
+            'heavy_modules': runs[0]['heavy_modules'],
+        })
+    return {'python': sys.version.split()[0], 'repeat': repeat,
+            'results': results}
+
+
+def main():
+    """
+    Main entry point for the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark and guard the "
+                                                 "import time of the "
+                                                 "personal_data modules.")
+    parser.add_argument('modules', nargs='*', default=list(MODULES),
+                        help="modules to import")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="fresh interpreters per module")
+    parser.add_argument('--max-ms', type=float,
+                        help="fail when a median import takes longer")
+    args = parser.parse_args()
+    report = run(args.modules, args.repeat)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    failed = False
+    for result in report['results']:
+        if result['heavy_modules']:
+            print(f"{result['module']} eagerly imports "
+                  f"{', '.join(result['heavy_modules'])}", file=sys.stderr)
+            failed = True
+        if args.max_ms is not None and \
+                result['import_us_median'] > args.max_ms * 1000:
+            print(f"{result['module']} takes "
+                  f"{result['import_us_median'] / 1000:.1f} ms to import",
+                  file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+This script benchmarks the redaction path of filtered_logger:
+ filter_datum, RedactingFormatter.format and the user_data logger
+  returned by get_logger, on synthetic log lines.
+It reports messages/sec, p50/p99 latency per message, the memory blocks
+ each message leaves allocated and the peak memory allocated per
+ message, as JSON so that runs can be compared between versions.
+"""
+
+from functools import partial
+from typing import Callable, Dict, List
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from filtered_logger import (PII_FIELDS, RedactingFormatter, filter_datum,
+                             get_logger)
+
+FIELD_COUNTS = (5, 20, 50)
+MESSAGE_LENGTHS = (100, 1000)
+SEPARATORS = (';', '|', ',')
+
+
+def synthetic_fields(count: int) -> List[str]:
+    """
+    Build a list of field names to redact, starting with PII_FIELDS.
+
+    Args:
+        count (int): Number of field names.
+
+    Returns:
+        List[str]: The field names.
+    """
+    extra_count = max(count - len(PII_FIELDS), 0)
+    extra = [f"pii_field_{i}" for i in range(extra_count)]
+    return (list(PII_FIELDS) + extra)[:count]
+
+
+def synthetic_message(fields: List[str], length: int, separator: str,
+                      rng: random.Random) -> str:
+    """
+    Build a log line holding every field plus non-PII filler pairs,
+     padded to roughly `length` characters.
+
+    Args:
+        fields (List[str]): Field names that appear in the line.
+        length (int): Target length of the line.
+        separator (str): The character that separates fields.
+        rng (random.Random): Source of the random values.
+
+    Returns:
+        str: The log line.
+    """
+    alphabet = string.ascii_letters + string.digits
+    pairs = [f"{field}={''.join(rng.choices(alphabet, k=8))}"
+             for field in fields]
+    index = 0
+    while sum(len(pair) + 1 for pair in pairs) < length:
+        value = ''.join(rng.choices(alphabet, k=16))
+        pairs.append(f"info_{index}={value}")
+        index += 1
+    rng.shuffle(pairs)
+    return separator.join(pairs) + separator
+
+
+def percentile(samples: List[int], fraction: float) -> int:
+    """
+    Return a percentile of sorted samples by nearest rank.
+
+    Args:
+        samples (List[int]): Sorted samples.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        int: The sample at that rank.
+    """
+    index = min(int(len(samples) * fraction), len(samples) - 1)
+    return samples[index]
+
+
+def count_blocks(target: Callable[[str], object],
+                 messages: List[str]) -> List[int]:
+    """
+    Count the memory blocks each call of a target leaves allocated, its
+     result included, with sys.getallocatedblocks(). The blocks the
+     counting itself allocates, measured with a target doing nothing,
+     are subtracted.
+
+    Args:
+        target (Callable[[str], object]): Function called per message.
+        messages (List[str]): The messages.
+
+    Returns:
+        List[int]: The block counts, sorted.
+    """
+    def run(call: Callable[[str], object]) -> List[int]:
+        counts = [0] * len(messages)
+        for index, message in enumerate(messages):
+            before = sys.getallocatedblocks()
+            result = call(message)
+            counts[index] = sys.getallocatedblocks() - before
+            del result
+        return counts
+
+    overhead = min(run(lambda message: None))
+    return sorted(count - overhead for count in run(target))
+
+
+def measure(target: Callable[[str], object],
+            messages: List[str]) -> Dict[str, float]:
+    """
+    Run a target over the messages, timing each call, then run it again
+     counting the memory blocks still allocated when the call returns,
+     its result included, and once more under tracemalloc to measure
+     the peak memory each call allocates above what was allocated
+     before it.
+
+    Args:
+        target (Callable[[str], object]): Function called per message.
+        messages (List[str]): The messages.
+
+    Returns:
+        Dict[str, float]: The measurements.
+    """
+    target(messages[0])
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for message in messages:
+        before = clock()
+        target(message)
+        latencies.append(clock() - before)
+    total = clock() - start
+    latencies.sort()
+
+    blocks = count_blocks(target, messages)
+
+    peaks = []
+    tracemalloc.start()
+    for message in messages:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        target(message)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    tracemalloc.stop()
+    peaks.sort()
+
+    return {
+        'messages_per_sec': len(messages) / (total / 1e9),
+        'p50_ns': percentile(latencies, 0.50),
+        'p99_ns': percentile(latencies, 0.99),
+        'p50_alloc_blocks': percentile(blocks, 0.50),
+        'max_alloc_blocks': blocks[-1],
+        'p50_peak_alloc_bytes': percentile(peaks, 0.50),
+        'max_peak_alloc_bytes': peaks[-1],
+    }
+
+
+def formatter_target(fields: List[str],
+                     separator: str) -> Callable[[str], str]:
+    """
+    Return a function formatting a message with RedactingFormatter.
+    """
+    formatter_class = type('Formatter', (RedactingFormatter,),
+                           {'SEPARATOR': separator})
+    formatter = formatter_class(fields)
+
+    def target(message: str) -> str:
+        record = logging.LogRecord("user_data", logging.INFO, __file__, 0,
+                                   message, None, None)
+        return formatter.format(record)
+
+    return target
+
+
+def run(count: int, queued: bool, seed: int) -> dict:
+    """
+    Run every benchmark case.
+
+    Args:
+        count (int): Number of messages per case.
+        queued (bool): Also benchmark get_logger(queued=True).
+        seed (int): Seed of the synthetic data.
+
+    Returns:
+        dict: The report.
+    """
+    rng = random.Random(seed)
+    devnull = open(os.devnull, 'w')
+    logger = logging.getLogger("user_data")
+    results = []
+    for field_count in FIELD_COUNTS:
+        fields = synthetic_fields(field_count)
+        for length in MESSAGE_LENGTHS:
+            for separator in SEPARATORS:
+                messages = [synthetic_message(fields, length, separator, rng)
+                            for _ in range(count)]
+                targets = {
+                    'filter_datum': lambda: partial(
+                        filter_datum, fields, RedactingFormatter.REDACTION,
+                        separator=separator),
+                    'RedactingFormatter.format': lambda: formatter_target(
+                        fields, separator),
+                }
+                if field_count == len(PII_FIELDS) and separator == ';':
+                    targets['get_logger'] = lambda: get_logger(
+                        stream=devnull).info
+                    if queued:
+                        targets['get_logger(queued=True)'] = \
+                            lambda: get_logger(queued=True,
+                                               stream=devnull).info
+                for name, make_target in targets.items():
+                    result = measure(make_target(), messages)
+                    for handler in list(logger.handlers):
+                        handler.close()
+                        logger.removeHandler(handler)
+                    result.update({'target': name, 'fields': field_count,
+                                   'length': length,
+                                   'separator': separator})
+                    results.append(result)
+    devnull.close()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'messages_per_case': count,
+        'results': results,
+    }
+
+
+def main():
+    """
+    Main entry point for the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the "
+                                                 "redaction path.")
+    parser.add_argument('--messages', type=int, default=2000,
+                        help="messages per benchmark case")
+    parser.add_argument('--queued', action='store_true',
+                        help="also benchmark get_logger(queued=True)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the synthetic data")
+    parser.add_argument('--output', help="write the JSON report here "
+                                         "instead of stdout")
+    args = parser.parse_args()
+    report = run(args.messages, args.queued, args.seed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
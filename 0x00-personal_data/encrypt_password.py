@@ -1,25 +1,37 @@
 #!/usr/bin/env python3
 """
 This script defines functions to hash
- passwords and validate them.
+ passwords and validate them, one at a time or in batches.
+bcrypt is imported on first use, to keep imports of this module cheap.
 """
 
-import bcrypt
-from bcrypt import hashpw
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+import os
+import time
 
 
-def hash_password(password: str) -> bytes:
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+_calibrated_rounds = None
+
+
+def hash_password(password: str, rounds: int = None) -> bytes:
     """
     Hashes a password using bcrypt.
 
     Args:
         password (str): The password to be hashed.
+        rounds (int): The bcrypt cost factor, bcrypt's default if None.
 
     Returns:
         bytes: The hashed password.
     """
+    import bcrypt
+
     password_bytes = password.encode()
-    hashed_password = hashpw(password_bytes, bcrypt.gensalt())
+    salt = bcrypt.gensalt() if rounds is None else bcrypt.gensalt(rounds)
+    hashed_password = bcrypt.hashpw(password_bytes, salt)
     return hashed_password
 
 
@@ -35,4 +47,184 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         bool: True if the password matches the hashed password,
          False otherwise.
     """
+    import bcrypt
+
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+def get_rounds(hashed_password: bytes) -> int:
+    """
+    Reads the cost factor of a bcrypt hash.
+
+    Args:
+        hashed_password (bytes): The hashed password, e.g. b"$2b$12$...".
+
+    Returns:
+        int: The cost factor the hash was computed with.
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+def _time_hash(rounds: int) -> float:
+    """
+    Measures one bcrypt hash at the given cost, in milliseconds.
+    """
+    import bcrypt
+
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+    return (time.perf_counter() - start) * 1000
+
+
+def calibrate_rounds(target_ms: float = 250.0) -> int:
+    """
+    Picks the highest bcrypt cost factor whose hash time on this machine
+     stays within the target. Each extra round doubles the work, so the
+     cost is extrapolated from a cheap measurement and then checked.
+
+    Args:
+        target_ms (float): Target hash/verify latency in milliseconds.
+
+    Returns:
+        int: The calibrated cost factor, also cached for
+         calibrated_rounds().
+    """
+    global _calibrated_rounds
+    rounds = MIN_ROUNDS
+    elapsed = _time_hash(rounds)
+    while rounds < MAX_ROUNDS and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed *= 2
+    while rounds > MIN_ROUNDS and _time_hash(rounds) > target_ms:
+        rounds -= 1
+    _calibrated_rounds = rounds
+    return rounds
+
+
+def calibrated_rounds() -> int:
+    """
+    Returns the calibrated cost factor, calibrating on first use with
+     the target in PASSWORD_HASH_TARGET_MS (250 ms by default).
+
+    Returns:
+        int: The calibrated cost factor.
+    """
+    if _calibrated_rounds is None:
+        target_ms = float(os.getenv('PASSWORD_HASH_TARGET_MS', '250'))
+        return calibrate_rounds(target_ms)
+    return _calibrated_rounds
+
+
+def verify_and_rehash(hashed_password: bytes, password: str,
+                      rounds: int = None) -> Tuple[bool, Optional[bytes]]:
+    """
+    Validates a password and, when its hash was computed with a different
+     cost factor than the wanted one, hashes it again with that cost.
+
+    Args:
+        hashed_password (bytes): The stored hashed password.
+        password (str): The plain text password.
+        rounds (int): The wanted cost factor, calibrated_rounds() if None.
+
+    Returns:
+        Tuple[bool, Optional[bytes]]: Whether the password is valid, and
+         the new hash to store, or None when the stored one is kept.
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if rounds is None:
+        rounds = calibrated_rounds()
+    if get_rounds(hashed_password) == rounds:
+        return True, None
+    return True, hash_password(password, rounds)
+
+
+def _ordered_map(function: Callable, items: Iterable,
+                 max_workers: int = None,
+                 progress: Callable[[int], None] = None,
+                 progress_every: int = 1000) -> Iterator:
+    """
+    Apply a function to items on a thread pool, yielding the results in
+     input order while keeping a bounded number of calls in flight.
+
+    Args:
+        function (Callable): The function to apply.
+        items (Iterable): The inputs, consumed lazily.
+        max_workers (int): Number of threads, os.cpu_count() if None.
+        progress (Callable[[int], None]): Called with the number of
+         results yielded so far, every `progress_every` results and once
+         at the end.
+        progress_every (int): Number of results between progress calls.
+
+    Yields:
+        The results of the calls, in input order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    max_workers = max_workers or os.cpu_count() or 1
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) < 2 * max_workers:
+                continue
+            yield pending.popleft().result()
+            done += 1
+            if progress is not None and done % progress_every == 0:
+                progress(done)
+        while pending:
+            yield pending.popleft().result()
+            done += 1
+            if progress is not None and done % progress_every == 0:
+                progress(done)
+    if progress is not None and done % progress_every != 0:
+        progress(done)
+
+
+def hash_passwords(passwords: Iterable[str], rounds: int = 12,
+                   max_workers: int = None,
+                   progress: Callable[[int], None] = None
+                   ) -> Iterator[bytes]:
+    """
+    Hashes many passwords using bcrypt on a thread pool; bcrypt releases
+     the GIL, so the hashes are computed in parallel.
+
+    Args:
+        passwords (Iterable[str]): The passwords to be hashed.
+        rounds (int): The bcrypt cost factor.
+        max_workers (int): Number of threads, os.cpu_count() if None.
+        progress (Callable[[int], None]): Called with the number of
+         passwords hashed so far, every 1000 passwords.
+
+    Yields:
+        bytes: The hashed passwords, in input order.
+    """
+    def hash_one(password: str) -> bytes:
+        return hash_password(password, rounds)
+
+    return _ordered_map(hash_one, passwords, max_workers, progress)
+
+
+def verify_passwords(pairs: Iterable[Tuple[bytes, str]],
+                     max_workers: int = None,
+                     progress: Callable[[int], None] = None
+                     ) -> Iterator[bool]:
+    """
+    Validates many passwords against their hashes on a thread pool.
+
+    Args:
+        pairs (Iterable[Tuple[bytes, str]]): (hashed password, plain text
+         password) pairs.
+        max_workers (int): Number of threads, os.cpu_count() if None.
+        progress (Callable[[int], None]): Called with the number of
+         passwords checked so far, every 1000 passwords.
+
+    Yields:
+        bool: Whether each password matches its hash, in input order.
+    """
+    def check_one(pair: Tuple[bytes, str]) -> bool:
+        hashed_password, password = pair
+        return is_valid(hashed_password, password)
+
+    return _ordered_map(check_one, pairs, max_workers, progress)
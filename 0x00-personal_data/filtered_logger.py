@@ -7,13 +7,121 @@ It includes functions to filter data,
  configure loggers, and connect to a MySQL database.
 """
 
-from typing import List
+from collections import Counter, deque
+from functools import lru_cache, partial
+from logging.handlers import QueueHandler
+from typing import (Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Sequence, TextIO, Tuple, Union)
+import argparse
+import copy
+import queue
+import random
 import re
 import logging
 import os
-import mysql.connector
+import sys
+import threading
+import time
+
+from pii_registry import PIIFieldRegistry
 
 PII_FIELDS = ('name', 'email', 'phone', 'ssn', 'password')
+_pii_registries = {}
+
+
+def get_pii_fields() -> Union[Tuple[str, ...], PIIFieldRegistry]:
+    """
+    Return the PII fields to obfuscate: the hot-reloaded registry of the
+     file named by PERSONAL_DATA_PII_FIELDS_FILE if set, else PII_FIELDS.
+    The registry starts from PII_FIELDS, so a missing, unreadable or
+     empty file never turns redaction off.
+
+    Returns:
+        Union[Tuple[str, ...], PIIFieldRegistry]: The PII fields.
+    """
+    path = os.getenv('PERSONAL_DATA_PII_FIELDS_FILE')
+    if not path:
+        return PII_FIELDS
+    if path not in _pii_registries:
+        _pii_registries[path] = PIIFieldRegistry(path, default=PII_FIELDS)
+    return _pii_registries[path]
+
+
+def _trie_pattern(fields: Iterable[str]) -> str:
+    """
+    Build a regular expression matching any of the fields, shaped as a
+     trie so that shared prefixes are matched once and the cost of a
+     match stays flat as the number of fields grows.
+
+    Args:
+        fields (Iterable[str]): Field names to match.
+
+    Returns:
+        str: The pattern, without groups.
+    """
+    trie = {}
+    for field in fields:
+        node = trie
+        for char in field:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: dict) -> str:
+        branches = [re.escape(char) + render(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        optional = '' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if optional else "")
+
+    return render(trie)
+
+
+@lru_cache(maxsize=128)
+def _compile_pattern(fields: Tuple[str, ...], separator: str) -> re.Pattern:
+    """
+    Compiles the fields into a single trie-shaped pattern whose only
+     group captures the field name.
+
+    Args:
+        fields (Tuple[str, ...]): Field names to obfuscate.
+        separator (str): The character that
+         separates fields in the log message.
+
+    Returns:
+        re.Pattern: The compiled pattern.
+    """
+    sep = re.escape(separator)
+    return re.compile(f"({_trie_pattern(fields)})=.*?{sep}")
+
+
+@lru_cache(maxsize=128)
+def _compile_redactor(fields: Tuple[str, ...], redaction: str,
+                      separator: str) -> Callable[[str], str]:
+    """
+    Compiles the fields into a single trie-shaped pattern and returns
+     a function that redacts all of them in one scan of a message.
+
+    Args:
+        fields (Tuple[str, ...]): Field names to obfuscate.
+        redaction (str): String to replace the field values with.
+        separator (str): The character that
+         separates fields in the log message.
+
+    Returns:
+        Callable[[str], str]: The redacting function.
+    """
+    if not fields:
+        return str
+    pattern = _compile_pattern(fields, separator)
+    suffix = f"={redaction}{separator}"
+
+    def replace(match: re.Match) -> str:
+        return match.group(1) + suffix
+
+    return partial(pattern.sub, replace)
 
 
 def filter_datum(fields: List[str], redaction: str,
@@ -31,11 +139,115 @@ def filter_datum(fields: List[str], redaction: str,
     Returns:
         str: The obfuscated log message.
     """
-    for field in fields:
-        pattern = f"{field}=.*?{separator}"
-        replacement = f"{field}={redaction}{separator}"
-        message = re.sub(pattern, replacement, message)
-    return message
+    return _compile_redactor(tuple(fields), redaction, separator)(message)
+
+
+def filter_datum_batch(fields: List[str], redaction: str,
+                       messages: Sequence[str], separator: str) -> List[str]:
+    """
+    Obfuscates specified fields in many log messages at once.
+
+    The messages are joined with newlines and split around the field
+     matches in one pass of the shared compiled pattern; values never
+     span a newline, so the buffer splits back into the same messages.
+
+    Args:
+        fields (List[str]): List of field names to obfuscate.
+        redaction (str): String to replace the field values with.
+        messages (Sequence[str]): The log messages to obfuscate.
+        separator (str): The character that
+         separates fields in the log message.
+
+    Returns:
+        List[str]: The obfuscated log messages, in the same order.
+    """
+    fields = tuple(fields)
+    if not fields or not messages:
+        return list(messages)
+    if "\n" not in redaction + separator:
+        suffix = f"={redaction}{separator}"
+        parts = _compile_pattern(fields, separator).split("\n".join(messages))
+        parts[1::2] = [name + suffix for name in parts[1::2]]
+        redacted = "".join(parts).split("\n")
+        if len(redacted) == len(messages):
+            return redacted
+    redact = _compile_redactor(fields, redaction, separator)
+    return [redact(message) for message in messages]
+
+
+class RedactionStats:
+    """
+    Counters and timings collected by an instrumented RedactingFormatter:
+     hits per redacted field, messages without PII, and the cumulative
+     and percentile time spent redacting.
+    """
+
+    def __init__(self, samples: int = 10000):
+        """
+        Initialize empty statistics.
+
+        Args:
+            samples (int): Number of most recent timings kept for the
+             percentiles.
+        """
+        self._lock = threading.Lock()
+        self._samples = samples
+        self.reset()
+
+    def reset(self):
+        """
+        Clear every counter and timing.
+        """
+        with self._lock:
+            self.field_hits = Counter()
+            self.messages = 0
+            self.messages_without_pii = 0
+            self.total_ns = 0
+            self._timings = deque(maxlen=self._samples)
+
+    def record(self, hits: List[str], elapsed_ns: int):
+        """
+        Record the redaction of one message.
+
+        Args:
+            hits (List[str]): Names of the fields redacted in the message.
+            elapsed_ns (int): Time spent redacting, in nanoseconds.
+        """
+        with self._lock:
+            self.messages += 1
+            if hits:
+                self.field_hits.update(hits)
+            else:
+                self.messages_without_pii += 1
+            self.total_ns += elapsed_ns
+            self._timings.append(elapsed_ns)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """
+        Return the current statistics as a JSON-serializable dict.
+
+        Args:
+            reset (bool): Whether to clear the statistics afterwards.
+
+        Returns:
+            dict: The counters, and the total and percentile redaction
+             times in nanoseconds.
+        """
+        with self._lock:
+            timings = sorted(self._timings)
+            snapshot = {
+                'messages': self.messages,
+                'messages_without_pii': self.messages_without_pii,
+                'field_hits': dict(self.field_hits),
+                'redaction_ns_total': self.total_ns,
+            }
+        for name, fraction in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99)):
+            index = min(int(len(timings) * fraction), len(timings) - 1)
+            snapshot[f'redaction_ns_{name}'] = timings[index] if timings else 0
+        snapshot['redaction_ns_max'] = timings[-1] if timings else 0
+        if reset:
+            self.reset()
+        return snapshot
 
 
 class RedactingFormatter(logging.Formatter):
@@ -46,36 +258,424 @@ class RedactingFormatter(logging.Formatter):
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: Union[List[str], PIIFieldRegistry],
+                 stats: RedactionStats = None):
         """
         Initialize the formatter with the fields to be obfuscated.
 
         Args:
-            fields (List[str]): List of field names to obfuscate.
+            fields (Union[List[str], PIIFieldRegistry]): List of field
+             names to obfuscate, or a registry whose current fields are
+             picked up whenever its file is reloaded.
+            stats (RedactionStats): Statistics to update on every message,
+             None to disable instrumentation.
         """
         super().__init__(self.FORMAT)
         self.fields = fields
+        self.stats = stats
+        self._compiled_fields = None
+        self._refresh()
+
+    def _refresh(self):
+        """
+        Recompile the redactor if the field names changed.
+        """
+        fields = self.fields
+        if isinstance(fields, PIIFieldRegistry):
+            fields = fields.fields
+        if fields is self._compiled_fields:
+            return
+        self._compiled_fields = fields
+        self._field_set = frozenset(fields)
+        self._redact = _compile_redactor(tuple(fields), self.REDACTION,
+                                         self.SEPARATOR)
+
+    def _redact_text(self, message: str, hits: List[str] = None) -> str:
+        """
+        Redact a free-text message with the field pattern.
+
+        Args:
+            message (str): The message to obfuscate.
+            hits (List[str]): If given, extended with the names of the
+             redacted fields.
+
+        Returns:
+            str: The obfuscated message.
+        """
+        if hits is None or not self._compiled_fields:
+            return self._redact(message)
+        pattern = _compile_pattern(tuple(self._compiled_fields),
+                                   self.SEPARATOR)
+        parts = pattern.split(message)
+        names = parts[1::2]
+        hits.extend(names)
+        suffix = f"={self.REDACTION}{self.SEPARATOR}"
+        parts[1::2] = [name + suffix for name in names]
+        return "".join(parts)
+
+    def render_payload(self, payload: Mapping,
+                       hits: List[str] = None) -> str:
+        """
+        Render a structured payload as "key=value;" pairs, replacing the
+         values of the obfuscated fields with a key lookup per pair.
+
+        Args:
+            payload (Mapping): The field names and values to render.
+            hits (List[str]): If given, extended with the names of the
+             redacted fields.
+
+        Returns:
+            str: The rendered and obfuscated pairs.
+        """
+        fields = self._field_set
+        redaction = self.REDACTION
+        separator = self.SEPARATOR
+        if hits is not None:
+            hits.extend(key for key in payload if key in fields)
+        return " ".join(
+            f"{key}={redaction if key in fields else value}{separator}"
+            for key, value in payload.items())
 
     def format(self, record: logging.LogRecord) -> str:
         """
         Format the log record, obfuscating specified fields.
 
+        Records logged with extra={'payload': mapping} are redacted by key
+         before rendering; any free-text message they also carry, and
+         plain records, are redacted with the field pattern.
+
         Args:
             record (logging.LogRecord): The log record to format.
 
         Returns:
             str: The formatted and obfuscated log message.
         """
-        original_message = super().format(record)
-        redacted_message = filter_datum(self.fields, self.REDACTION,
-                                        original_message, self.SEPARATOR)
-        return redacted_message
+        self._refresh()
+        hits = None if self.stats is None else []
+        payload = getattr(record, 'payload', None)
+        if payload is None:
+            original_message = super().format(record)
+            start = time.perf_counter_ns()
+            redacted = self._redact_text(original_message, hits)
+        else:
+            message = record.getMessage()
+            start = time.perf_counter_ns()
+            redacted = self.render_payload(payload, hits)
+            if message:
+                redacted = f"{self._redact_text(message, hits)} {redacted}"
+        if hits is not None:
+            self.stats.record(hits, time.perf_counter_ns() - start)
+        if payload is None:
+            return redacted
+        record = copy.copy(record)
+        record.msg = redacted
+        record.args = None
+        return super().format(record)
+
+    def format_batch(self, records: Sequence[logging.LogRecord]) -> List[str]:
+        """
+        Format many log records, obfuscating specified fields, with one
+         redaction pass over all the plain records. Instrumented
+         formatters format the records one by one to time each of them.
+
+        Args:
+            records (Sequence[logging.LogRecord]): The log records.
+
+        Returns:
+            List[str]: The formatted and obfuscated log messages, in the
+             same order.
+        """
+        if self.stats is not None:
+            return [self.format(record) for record in records]
+        self._refresh()
+        formatted = []
+        plain = []
+        for index, record in enumerate(records):
+            if getattr(record, 'payload', None) is None:
+                formatted.append(super().format(record))
+                plain.append(index)
+            else:
+                formatted.append(self.format(record))
+        redacted = filter_datum_batch(self._compiled_fields, self.REDACTION,
+                                      [formatted[i] for i in plain],
+                                      self.SEPARATOR)
+        for index, message in zip(plain, redacted):
+            formatted[index] = message
+        return formatted
+
+
+class OverflowQueueHandler(QueueHandler):
+    """
+    Queue handler that hands records to a background listener and
+     applies an overflow policy when the bounded queue is full.
+    """
+    OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-new')
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = 'block'):
+        """
+        Initialize the handler with the queue and the overflow policy.
 
+        Args:
+            log_queue (queue.Queue): The bounded queue to feed.
+            overflow (str): One of 'block', 'drop-oldest' or 'drop-new'.
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+        self.closed = False
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepare a record for queuing without formatting it, so that
+         redaction happens on the listener thread.
+
+        Args:
+            record (logging.LogRecord): The record to enqueue.
+
+        Returns:
+            logging.LogRecord: A copy of the record with its arguments merged.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Put a record on the queue according to the overflow policy.
+        Once the handler is closed no listener drains the queue, so the
+         record is dropped.
 
-def get_logger() -> logging.Logger:
+        Args:
+            record (logging.LogRecord): The record to enqueue.
+        """
+        if self.closed:
+            self.dropped += 1
+            return
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == 'drop-new':
+                    return
+            try:
+                oldest = self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            if oldest is BatchingQueueListener._sentinel:
+                # The listener is stopping: keep its stop request and
+                # drop this record instead.
+                self.queue.put(oldest)
+                return
+
+    def close(self):
+        """
+        Stop the listener, flushing every queued record, then close.
+        Called by logging.shutdown() at interpreter exit; records logged
+         afterwards are dropped.
+        """
+        self.closed = True
+        if self.listener is not None:
+            self.listener.stop()
+        super().close()
+
+
+class BatchingQueueListener:
+    """
+    Background listener that drains a log queue, formats the records
+     with a stream handler's formatter and writes them in batches.
+    """
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.Queue,
+                 handler: logging.StreamHandler, batch_size: int = 256):
+        """
+        Initialize the listener.
+
+        Args:
+            log_queue (queue.Queue): The queue to drain.
+            handler (logging.StreamHandler): Handler whose formatter and
+             stream are used for output.
+            batch_size (int): Maximum number of records per write.
+        """
+        self.queue = log_queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        """
+        Start the listener thread.
+        """
+        self._thread = threading.Thread(target=self._monitor, daemon=True,
+                                        name="user_data-listener")
+        self._thread.start()
+
+    def stop(self):
+        """
+        Ask the listener to stop and wait until the queue is flushed.
+        """
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def _format(self, records: List[logging.LogRecord]) -> List[str]:
+        """
+        Format a batch of records, in one redaction pass when the
+         formatter supports it.
+        """
+        format_batch = getattr(self.handler.formatter, 'format_batch', None)
+        if format_batch is not None:
+            try:
+                return format_batch(records)
+            except Exception:
+                pass
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.handler.format(record))
+            except Exception:
+                self.handler.handleError(record)
+        return lines
+
+    def _monitor(self):
+        """
+        Listener loop: block for one record, then take whatever else is
+         already queued and write the whole batch at once. A batch that
+         fails to be formatted or written is reported through the
+         handler's handleError and the loop goes on.
+        """
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch
+                       if record is not self._sentinel]
+            stop = len(records) < len(batch)
+            try:
+                lines = self._format(records)
+                if lines:
+                    self.handler.acquire()
+                    try:
+                        self.handler.stream.write("\n".join(lines) + "\n")
+                        self.handler.flush()
+                    finally:
+                        self.handler.release()
+            except Exception:
+                self.handler.handleError(records[-1])
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Logger filter keeping a random fraction of the records of each level.
+    """
+
+    def __init__(self, rates: Dict[int, float]):
+        """
+        Initialize the filter.
+
+        Args:
+            rates (Dict[int, float]): Fraction of records kept per level,
+             e.g. {logging.INFO: 0.1}; unlisted levels are all kept.
+        """
+        super().__init__()
+        self.rates = rates
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decide whether the record is kept.
+        """
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Logger filter capping the record rate with a token bucket.
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Initialize the filter with a full bucket.
+
+        Args:
+            rate (float): Records allowed per second.
+            burst (int): Bucket capacity, max(1, rate) if None.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.dropped = 0
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decide whether the record is kept, taking a token if so.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            self.dropped += 1
+            return False
+
+
+def get_logger(queued: bool = False, queue_size: int = 10000,
+               overflow: str = 'block', stream: TextIO = None,
+               stats: RedactionStats = None,
+               sample_rates: Dict[int, float] = None,
+               rate_limit: float = None,
+               burst: int = None) -> logging.Logger:
     """
     Configure and return a logger for user data.
 
+    In queued mode, the request thread only enqueues the record: redaction
+     and output run on a background listener thread that writes in
+     batches. Queued records are flushed when the handler is closed,
+     which logging.shutdown() does at interpreter exit.
+
+    Sampling and rate limiting are logger filters, so a dropped record
+     never reaches a handler: it is neither formatted nor redacted. Pass
+     message arguments lazily, as in logger.info("email=%s;", email), so
+     that even the message is only built for kept records.
+
+    Args:
+        queued (bool): Whether to log through a bounded queue.
+        queue_size (int): Maximum number of pending records in queued mode.
+        overflow (str): What to do when the queue is full: 'block',
+         'drop-oldest' or 'drop-new'.
+        stream (TextIO): Output stream, sys.stderr by default.
+        stats (RedactionStats): Redaction statistics to collect, see
+         RedactionStats.snapshot(); None disables instrumentation.
+        sample_rates (Dict[int, float]): Fraction of records kept per
+         level, None to keep every record.
+        rate_limit (float): Maximum records per second, None for no limit.
+        burst (int): Token bucket capacity of the rate limit.
+
     Returns:
         logging.Logger: Configured logger instance.
     """
@@ -83,50 +683,549 @@ def get_logger() -> logging.Logger:
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
-    stream_handler = logging.StreamHandler()
-    formatter = RedactingFormatter(PII_FIELDS)
+    for log_filter in list(logger.filters):
+        if isinstance(log_filter, (SamplingFilter, RateLimitFilter)):
+            logger.removeFilter(log_filter)
+    if sample_rates:
+        logger.addFilter(SamplingFilter(sample_rates))
+    if rate_limit is not None:
+        logger.addFilter(RateLimitFilter(rate_limit, burst))
+
+    stream_handler = logging.StreamHandler(stream)
+    formatter = RedactingFormatter(get_pii_fields(), stats)
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    if not queued:
+        logger.addHandler(stream_handler)
+        return logger
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = OverflowQueueHandler(log_queue, overflow)
+    queue_handler.listener = BatchingQueueListener(log_queue, stream_handler)
+    queue_handler.listener.start()
+    logger.addHandler(queue_handler)
 
     return logger
 
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def _mysql_pool() -> 'mysql.connector.pooling.MySQLConnectionPool':
+    """
+    Create, on first use, the MySQL connection pool configured from the
+     PERSONAL_DATA_DB_* environment variables.
+
+    Returns:
+        mysql.connector.pooling.MySQLConnectionPool: The shared pool.
+    """
+    import mysql.connector.pooling
+
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            pool_size = int(os.getenv('PERSONAL_DATA_DB_POOL_SIZE', '5'))
+            timeout = int(os.getenv('PERSONAL_DATA_DB_TIMEOUT', '10'))
+            _db_pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="personal_data",
+                pool_size=pool_size,
+                user=os.getenv('PERSONAL_DATA_DB_USERNAME', 'root'),
+                password=os.getenv('PERSONAL_DATA_DB_PASSWORD', ''),
+                host=os.getenv('PERSONAL_DATA_DB_HOST', 'localhost'),
+                database=os.getenv('PERSONAL_DATA_DB_NAME'),
+                connection_timeout=timeout)
+        return _db_pool
+
+
+def _connect_mysql() -> 'mysql.connector.pooling.PooledMySQLConnection':
     """
-    Establish and return a connection to the
-     MySQL database using environment variables.
+    Check a connection out of the MySQL pool, waiting up to
+     PERSONAL_DATA_DB_POOL_TIMEOUT seconds for one to be returned, and
+     make sure it is still alive before handing it out.
 
     Returns:
-        mysql.connector.connection.MySQLConnection: Database connection object.
+        mysql.connector.pooling.PooledMySQLConnection: Pooled connection,
+         returned to the pool by close().
     """
-    user = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
-    password = os.getenv('PERSONAL_DATA_DB_PASSWORD', '')
-    host = os.getenv('PERSONAL_DATA_DB_HOST', 'localhost')
-    database = os.getenv('PERSONAL_DATA_DB_NAME')
+    import mysql.connector
 
-    connection = mysql.connector.connect(user=user,
-                                         password=password,
-                                         host=host,
-                                         database=database)
+    pool = _mysql_pool()
+    timeout = float(os.getenv('PERSONAL_DATA_DB_POOL_TIMEOUT', '30'))
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        connection.ping(reconnect=True, attempts=3, delay=1)
+    except mysql.connector.Error:
+        connection.close()
+        raise
     return connection
 
 
-def main():
+class SQLiteCursor:
+    """
+    Cursor adapter giving a sqlite3 cursor the parts of the
+     mysql.connector cursor API used by this script.
+    """
+
+    def __init__(self, cursor: 'sqlite3.Cursor'):
+        """
+        Initialize the adapter.
+
+        Args:
+            cursor (sqlite3.Cursor): The wrapped cursor.
+        """
+        self._cursor = cursor
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        """
+        Names of the columns of the last executed query.
+        """
+        description = self._cursor.description or ()
+        return tuple(column[0] for column in description)
+
+    def execute(self, operation: str, params: Sequence = ()):
+        """
+        Execute a query.
+
+        Args:
+            operation (str): The SQL query.
+            params (Sequence): Query parameters, using "?" placeholders.
+        """
+        self._cursor.execute(operation, params)
+
+    def fetchmany(self, size: int = 1) -> List[tuple]:
+        """
+        Fetch the next `size` rows of the result.
+        """
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self) -> List[tuple]:
+        """
+        Fetch the remaining rows of the result.
+        """
+        return self._cursor.fetchall()
+
+    def __iter__(self) -> Iterator[tuple]:
+        """
+        Iterate over the remaining rows of the result.
+        """
+        return iter(self._cursor)
+
+    def close(self):
+        """
+        Close the cursor.
+        """
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Local stand-in for a MySQL connection backed by a SQLite file, so
+     that exports can be tested and benchmarked without a MySQL server.
+    """
+
+    def __init__(self, database: str):
+        """
+        Open the SQLite database.
+
+        Args:
+            database (str): Path of the database file, or ":memory:".
+        """
+        import sqlite3
+
+        self._connection = sqlite3.connect(database,
+                                           check_same_thread=False)
+
+    def cursor(self, buffered: bool = None) -> SQLiteCursor:
+        """
+        Return a new cursor. SQLite cursors always stream their results,
+         so `buffered` is accepted for compatibility and ignored.
+        """
+        return SQLiteCursor(self._connection.cursor())
+
+    def commit(self):
+        """
+        Commit the current transaction.
+        """
+        self._connection.commit()
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self._connection.close()
+
+
+def _connect_sqlite() -> SQLiteConnection:
+    """
+    Open the SQLite stand-in database named by PERSONAL_DATA_DB_NAME.
+
+    Returns:
+        SQLiteConnection: Database connection object.
+    """
+    return SQLiteConnection(os.getenv('PERSONAL_DATA_DB_NAME', ':memory:'))
+
+
+DB_BACKENDS = {
+    'mysql': _connect_mysql,
+    'sqlite': _connect_sqlite,
+}
+
+
+def get_db() -> 'mysql.connector.pooling.PooledMySQLConnection':
+    """
+    Return a connection to the database configured by the
+     environment variables.
+
+    PERSONAL_DATA_DB_BACKEND selects the backend in DB_BACKENDS: 'mysql'
+     (the default) checks a connection out of a pool, 'sqlite' opens the
+     local SQLite stand-in. Closing the connection returns it to the pool.
+     The database driver is only imported on first use, so that importing
+     this module for its formatter stays cheap.
+
+    Returns:
+        mysql.connector.pooling.PooledMySQLConnection: Database connection
+         object.
+    """
+    backend = os.getenv('PERSONAL_DATA_DB_BACKEND', 'mysql')
+    if backend not in DB_BACKENDS:
+        raise ValueError(f"unknown database backend: {backend}")
+    return DB_BACKENDS[backend]()
+
+
+def iter_batches(cursor, batch_size: int = 1000) -> Iterator[List[tuple]]:
+    """
+    Yield the rows of an executed query in fetchmany batches.
+
+    Args:
+        cursor: An unbuffered cursor on which a query was executed.
+        batch_size (int): Number of rows per fetchmany call.
+
+    Yields:
+        List[tuple]: One batch of database rows.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_rows(cursor, batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    Yield the rows of an executed query, fetching them in batches so
+     that at most one batch is held in memory.
+
+    Args:
+        cursor: An unbuffered cursor on which a query was executed.
+        batch_size (int): Number of rows per fetchmany call.
+
+    Yields:
+        tuple: One database row.
+    """
+    for rows in iter_batches(cursor, batch_size):
+        yield from rows
+
+
+def iter_log_lines(column_names: Sequence[str],
+                   rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Turn database rows into "column=value;" log messages.
+
+    Args:
+        column_names (Sequence[str]): Names of the selected columns.
+        rows (Iterable[tuple]): The database rows.
+
+    Yields:
+        str: One log message per row.
+    """
+    for row in rows:
+        yield " ".join(f"{column}={value};"
+                       for column, value in zip(column_names, row))
+
+
+def iter_payloads(column_names: Sequence[str],
+                  rows: Iterable[tuple]) -> Iterator[dict]:
+    """
+    Turn database rows into structured log payloads.
+
+    Args:
+        column_names (Sequence[str]): Names of the selected columns.
+        rows (Iterable[tuple]): The database rows.
+
+    Yields:
+        dict: One column name to value mapping per row.
+    """
+    for row in rows:
+        yield dict(zip(column_names, row))
+
+
+def report_progress(items: Iterable, every: int,
+                    logger: logging.Logger) -> Iterator:
+    """
+    Pass items through unchanged, logging the count and throughput
+     every `every` items and once at the end.
+
+    Args:
+        items (Iterable): The items to count.
+        every (int): Number of items between two reports.
+        logger (logging.Logger): Logger receiving the reports.
+
+    Yields:
+        The items, unchanged.
+    """
+    start = time.perf_counter()
+    count = 0
+
+    def report():
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        logger.info("exported %d rows in %.1fs (%.0f rows/s)",
+                    count, elapsed, rate)
+
+    for item in items:
+        yield item
+        count += 1
+        if every > 0 and count % every == 0:
+            report()
+    report()
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a table or column name for MySQL (SQLite accepts the same
+     backquoted form).
+
+    Args:
+        name (str): The identifier.
+
+    Returns:
+        str: The quoted identifier.
+    """
+    return "`" + name.replace("`", "``") + "`"
+
+
+def table_columns(cursor, table: str) -> Tuple[str, ...]:
+    """
+    Return the column names of a table without fetching any row.
+
+    Args:
+        cursor: A database cursor.
+        table (str): The table name.
+
+    Returns:
+        Tuple[str, ...]: The column names, in table order.
+    """
+    cursor.execute(f"SELECT * FROM {quote_identifier(table)} LIMIT 0;")
+    cursor.fetchall()
+    return tuple(cursor.column_names)
+
+
+def redacted_select(table: str, columns: Sequence[str],
+                    fields: Iterable[str],
+                    redaction: str = RedactingFormatter.REDACTION) -> str:
+    """
+    Build a SELECT of every column of a table in which the PII columns
+     are replaced by a constant, so that their values never leave the
+     database.
+
+    Args:
+        table (str): The table name.
+        columns (Sequence[str]): The column names of the table.
+        fields (Iterable[str]): Names of the PII columns.
+        redaction (str): Constant selected in place of PII values.
+
+    Returns:
+        str: The query.
+    """
+    fields = frozenset(fields)
+    literal = "'" + redaction.replace("'", "''") + "'"
+    projection = ", ".join(
+        f"{literal} AS {quote_identifier(column)}" if column in fields
+        else quote_identifier(column)
+        for column in columns)
+    return f"SELECT {projection} FROM {quote_identifier(table)};"
+
+
+def users_query(cursor, sql_redaction: bool = False) -> str:
+    """
+    Return the query exporting the users table.
+
+    Args:
+        cursor: A database cursor, used to read the column names.
+        sql_redaction (bool): Whether the PII columns are redacted by the
+         database instead of being selected.
+
+    Returns:
+        str: The query.
+    """
+    if not sql_redaction:
+        return "SELECT * FROM users;"
+    return redacted_select("users", table_columns(cursor, "users"),
+                           get_pii_fields())
+
+
+def stream_users(batch_size: int = 1000, progress_every: int = 100000,
+                 sql_redaction: bool = False):
+    """
+    Export the users table with bounded memory: rows are read from an
+     unbuffered cursor in batches and logged as structured payloads
+     as they arrive.
+
+    Args:
+        batch_size (int): Number of rows per fetchmany call.
+        progress_every (int): Number of rows between progress reports,
+         0 to report only at the end.
+        sql_redaction (bool): Whether the PII columns are redacted in
+         the SELECT itself.
+    """
+    db_connection = get_db()
+    logger = get_logger()
+    cursor = db_connection.cursor(buffered=False)
+    try:
+        cursor.execute(users_query(cursor, sql_redaction))
+        rows = iter_rows(cursor, batch_size)
+        payloads = iter_payloads(cursor.column_names, rows)
+        progress = logging.getLogger("user_data.export")
+        for payload in report_progress(payloads, progress_every, progress):
+            logger.info("", extra={'payload': payload})
+    finally:
+        cursor.close()
+        db_connection.close()
+
+
+_worker_formatter = None
+
+
+def _format_batch(messages: List[Union[str, dict]]) -> str:
+    """
+    Pool worker: format and redact a batch of log messages the way the
+     user_data logger would. Structured payloads are redacted by key,
+     without the pattern pass over their values.
+
+    Args:
+        messages (List[Union[str, dict]]): The log messages or payloads
+         of one batch.
+
+    Returns:
+        str: The formatted lines, newline-terminated.
+    """
+    global _worker_formatter
+    if _worker_formatter is None:
+        _worker_formatter = RedactingFormatter(get_pii_fields())
+    records = []
+    for message in messages:
+        attributes = {'name': "user_data", 'levelno': logging.INFO,
+                      'levelname': "INFO", 'msg': message}
+        if isinstance(message, dict):
+            attributes.update(msg="", payload=message)
+        records.append(logging.makeLogRecord(attributes))
+    lines = _worker_formatter.format_batch(records)
+    return "".join(line + "\n" for line in lines)
+
+
+def parallel_users(workers: int = None, batch_size: int = 1000,
+                   stream: TextIO = None, sql_redaction: bool = False):
+    """
+    Export the users table through a reader / process pool / writer
+     pipeline: the reader turns fetchmany batches into log messages,
+     worker processes redact them and the writer emits the batches in
+     the original row order. With SQL redaction the rows are sent as
+     payloads, so the columns the database already replaced are not
+     scanned again.
+
+    Args:
+        workers (int): Number of worker processes, os.cpu_count() if None.
+        batch_size (int): Number of rows per batch.
+        stream (TextIO): Output stream, sys.stderr by default.
+        sql_redaction (bool): Whether the PII columns are redacted in
+         the SELECT itself.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    stream = stream or sys.stderr
+    workers = workers or os.cpu_count() or 1
+    db_connection = get_db()
+    cursor = db_connection.cursor(buffered=False)
+    try:
+        cursor.execute(users_query(cursor, sql_redaction))
+        column_names = cursor.column_names
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            to_messages = iter_payloads if sql_redaction \
+                else iter_log_lines
+            for rows in iter_batches(cursor, batch_size):
+                messages = list(to_messages(column_names, rows))
+                pending.append(executor.submit(_format_batch, messages))
+                if len(pending) >= 2 * workers:
+                    stream.write(pending.popleft().result())
+            while pending:
+                stream.write(pending.popleft().result())
+        stream.flush()
+    finally:
+        cursor.close()
+        db_connection.close()
+
+
+def main(argv: List[str] = None):
     """
     Main entry point for the script.
     Fetches user data from the database
      and logs it with PII obfuscation.
+
+    Args:
+        argv (List[str]): Command line arguments, sys.argv[1:] by default.
     """
+    parser = argparse.ArgumentParser(description="Log the users table "
+                                                 "with PII obfuscation.")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream rows in batches with bounded memory")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="rows per fetch in streaming "
+                             "and parallel modes")
+    parser.add_argument('--progress-every', type=int, default=100000,
+                        help="rows between progress reports "
+                             "in streaming mode")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="redact in this many worker processes, "
+                             "keeping row order")
+    parser.add_argument('--sql-redaction', action='store_true',
+                        help="replace PII columns by a constant in the "
+                             "SELECT so their values never leave the "
+                             "database")
+    args = parser.parse_args(argv)
+    if args.workers > 0:
+        parallel_users(args.workers, args.batch_size,
+                       sql_redaction=args.sql_redaction)
+        return
+    if args.stream:
+        stream_users(args.batch_size, args.progress_every,
+                     args.sql_redaction)
+        return
+
     db_connection = get_db()
     logger = get_logger()
     cursor = db_connection.cursor()
-    cursor.execute("SELECT * FROM users;")
+    cursor.execute(users_query(cursor, args.sql_redaction))
     column_names = cursor.column_names
 
-    for row in cursor:
-        log_message = "".join(f"{column}={value}; "
-                              for column, value in zip(column_names, row))
-        logger.info(log_message.strip())
+    if args.sql_redaction:
+        for payload in iter_payloads(column_names, cursor):
+            logger.info("", extra={'payload': payload})
+    else:
+        for row in cursor:
+            log_message = "".join(f"{column}={value}; "
+                                  for column, value in zip(column_names,
+                                                           row))
+            logger.info(log_message.strip())
 
     cursor.close()
     db_connection.close()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+This module defines a registry of PII field names loaded from a
+ configuration file and reloaded when the file changes, without
+  restarting the process.
+"""
+
+from typing import Iterable, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+
+def parse_fields(text: str, json_format: bool = False) -> Tuple[str, ...]:
+    """
+    Parse PII field names from the content of a configuration file.
+
+    Text files hold one field name per line; blank lines and lines
+     starting with "#" are ignored. JSON files hold either a list of
+     field names or an object mapping table names to such lists.
+
+    Args:
+        text (str): The content of the file.
+        json_format (bool): Whether the content is JSON.
+
+    Returns:
+        Tuple[str, ...]: The field names, without duplicates, in order.
+
+    Raises:
+        ValueError: If the content is not valid, or the JSON holds
+         anything but such lists of strings.
+    """
+    if json_format:
+        data = json.loads(text)
+        lists = data.values() if isinstance(data, dict) else [data]
+        for names in lists:
+            if not isinstance(names, list) or \
+                    not all(isinstance(name, str) for name in names):
+                raise ValueError("PII fields must be a list of strings "
+                                 "or an object mapping tables to lists "
+                                 "of strings")
+        names: Iterable[str] = (name for table in lists for name in table)
+    else:
+        names = (line.strip() for line in text.splitlines())
+        names = (name for name in names
+                 if name and not name.startswith('#'))
+    return tuple(dict.fromkeys(names))
+
+
+class PIIFieldRegistry:
+    """
+    PII field names loaded from a configuration file. The file is checked
+     for changes at most once per `check_interval` seconds and reloaded
+     when its modification time or size changes.
+    The registry fails closed: a file that cannot be loaded, or that
+     holds no field names, keeps the previous names, and the default
+     names stand until a first load succeeds.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0,
+                 default: Iterable[str] = (), allow_empty: bool = False):
+        """
+        Initialize the registry and load the file.
+
+        Args:
+            path (str): Path of the configuration file; files ending with
+             ".json" are read as JSON.
+            check_interval (float): Minimum delay between two checks of
+             the file, in seconds.
+            default (Iterable[str]): Field names used until the file is
+             loaded.
+            allow_empty (bool): Whether a file holding no field names
+             is accepted, turning redaction off.
+
+        Raises:
+            ValueError: If no field names are loaded and there is no
+             default.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.allow_empty = allow_empty
+        self._fields: Tuple[str, ...] = tuple(default)
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+        if not self._fields and not allow_empty:
+            raise ValueError(f"no PII fields loaded from {path}")
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """
+        The current field names. The same tuple object is returned until
+         the file changes, so callers can cache on identity.
+        """
+        if time.monotonic() >= self._next_check:
+            self.reload()
+        return self._fields
+
+    def reload(self) -> bool:
+        """
+        Reload the field names if the file changed since the last load.
+        A file that cannot be read or parsed, or that holds no field
+         names unless allow_empty is set, keeps the previous names.
+
+        Returns:
+            bool: True if new field names were loaded.
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                stat = os.stat(self.path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signature == self._signature:
+                    return False
+                with open(self.path, 'r') as file:
+                    fields = parse_fields(file.read(),
+                                          self.path.endswith('.json'))
+            except (OSError, ValueError) as error:
+                logging.getLogger(__name__).warning(
+                    "cannot load PII fields from %s: %s", self.path, error)
+                return False
+            self._signature = signature
+            if not fields and not self.allow_empty:
+                logging.getLogger(__name__).warning(
+                    "no PII fields in %s, keeping the previous ones",
+                    self.path)
+                return False
+            self._fields = fields
+            return True
+
+    def __iter__(self):
+        """
+        Iterate over the current field names.
+        """
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        """
+        Return the number of current field names.
+        """
+        return len(self.fields)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+This script redacts PII in existing log files with the filter_datum
+ semantics: the file is memory-mapped, split into line-aligned chunks
+  that worker processes redact in parallel, and the result replaces the
+   output file atomically.
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+import argparse
+import mmap
+import os
+import re
+import shutil
+import tempfile
+
+from filtered_logger import (RedactingFormatter, _compile_pattern,
+                             get_pii_fields)
+
+
+@lru_cache(maxsize=16)
+def _compile_bytes_pattern(fields: Tuple[str, ...],
+                           separator: str) -> re.Pattern:
+    """
+    Return the filter_datum pattern for the fields, compiled for bytes.
+    """
+    return re.compile(_compile_pattern(fields, separator).pattern.encode())
+
+
+def redact_chunk(path: str, start: int, end: int, fields: Tuple[str, ...],
+                 redaction: str, separator: str) -> bytes:
+    """
+    Worker: redact the bytes [start, end) of a file.
+
+    Args:
+        path (str): Path of the log file.
+        start (int): Offset of the first byte of the chunk.
+        end (int): Offset just past the last byte of the chunk.
+        fields (Tuple[str, ...]): Field names to obfuscate.
+        redaction (str): String to replace the field values with.
+        separator (str): The character that
+         separates fields in the log message.
+
+    Returns:
+        bytes: The redacted chunk.
+    """
+    with open(path, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        chunk = mapped[start:end]
+    if not fields:
+        return chunk
+    suffix = f"={redaction}{separator}".encode()
+    parts = _compile_bytes_pattern(fields, separator).split(chunk)
+    parts[1::2] = [name + suffix for name in parts[1::2]]
+    return b"".join(parts)
+
+
+def chunk_bounds(mapped: mmap.mmap,
+                 chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Split a mapped file into chunks of about chunk_size bytes that end
+     on a line boundary.
+
+    Args:
+        mapped (mmap.mmap): The mapped file.
+        chunk_size (int): Target size of a chunk in bytes.
+
+    Yields:
+        Tuple[int, int]: The start and end offsets of each chunk.
+    """
+    size = len(mapped)
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        if end < size:
+            newline = mapped.find(b"\n", end - 1)
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def redact_file(path: str, output: str = None, fields: List[str] = None,
+                workers: int = None, chunk_size: int = 64 << 20):
+    """
+    Redact a log file into output, in place if output is None.
+
+    Args:
+        path (str): Path of the log file.
+        output (str): Path of the redacted file.
+        fields (List[str]): Field names to obfuscate, get_pii_fields()
+         if None.
+        workers (int): Number of worker processes, os.cpu_count() if None.
+        chunk_size (int): Target size of a chunk in bytes.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    output = output or path
+    fields = tuple(get_pii_fields() if fields is None else fields)
+    workers = workers or os.cpu_count() or 1
+    redaction = RedactingFormatter.REDACTION
+    separator = RedactingFormatter.SEPARATOR
+    directory = os.path.dirname(os.path.abspath(output))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory,
+                                             prefix=".redact-")
+    try:
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            if os.path.getsize(path) > 0:
+                with open(path, 'rb') as file, \
+                        mmap.mmap(file.fileno(), 0,
+                                  access=mmap.ACCESS_READ) as mapped, \
+                        ProcessPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()
+                    for start, end in chunk_bounds(mapped, chunk_size):
+                        pending.append(executor.submit(
+                            redact_chunk, path, start, end, fields,
+                            redaction, separator))
+                        if len(pending) >= 2 * workers:
+                            temp_file.write(pending.popleft().result())
+                    while pending:
+                        temp_file.write(pending.popleft().result())
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, output)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def main():
+    """
+    Main entry point for the script.
+    """
+    parser = argparse.ArgumentParser(description="Redact PII in existing "
+                                                 "log files.")
+    parser.add_argument('path', help="log file to redact")
+    parser.add_argument('-o', '--output',
+                        help="redacted file, the log file itself if omitted")
+    parser.add_argument('--fields',
+                        help="comma-separated field names, the PII fields "
+                             "of filtered_logger by default")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="worker processes, one per CPU by default")
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help="chunk size in MiB")
+    args = parser.parse_args()
+    fields = args.fields.split(',') if args.fields else None
+    redact_file(args.path, args.output, fields, args.workers or None,
+                args.chunk_size << 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+import json
+from urllib.parse import urlencode
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
 
 
@@ -10,13 +12,46 @@ from models.user import User
 def get_all_users() -> str:
     """
     GET /api/v1/users
-    Returns a list of all User objects in JSON format.
+    Returns a list of User objects in JSON format, all of them unless a
+    page is requested. Pages are ordered by ID; a full page has a "Link"
+    header to the next one.
+
+    Query parameters:
+        - limit (int): The maximum number of users to return (optional).
+        - offset (int): The number of users to skip (optional).
+        - cursor (str): The ID of the last user of the previous page;
+          the page starts after it (optional).
+        - format (str): "ndjson" to stream one JSON user per line, the
+          ID of the last line being the next cursor (optional).
 
     Returns:
-        str: JSON response containing a list of all users.
+        str: JSON response containing a list of users.
+        400 error if a query parameter is invalid.
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    offset = request.args.get('offset', '0')
+    try:
+        limit = None if limit is None else int(limit)
+        offset = int(offset)
+    except ValueError:
+        return jsonify({'error': "Wrong pagination"}), 400
+    if (limit is not None and limit <= 0) or offset < 0:
+        return jsonify({'error': "Wrong pagination"}), 400
+    users = User.page(request.args.get('cursor'), limit, offset)
+
+    if request.args.get('format') == 'ndjson':
+        lines = (json.dumps(user.to_json()) + "\n" for user in users)
+        return Response(lines, mimetype='application/x-ndjson')
+
+    page = [user.to_json() for user in users]
+    response = jsonify(page)
+    if limit is not None and len(page) == limit:
+        args = request.args.to_dict()
+        args.pop('offset', None)
+        args['cursor'] = page[-1]['id']
+        response.headers['Link'] = '<{}?{}>; rel="next"'.format(
+            request.base_url, urlencode(args))
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
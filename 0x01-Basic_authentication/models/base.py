@@ -2,17 +2,28 @@
 """Module for handling base objects"""
 
 from datetime import datetime
-from typing import TypeVar, List, Iterable, Dict
+from itertools import islice
+from typing import TypeVar, List, Iterable, Iterator, Dict, Tuple
 from os import path
+import heapq
 import json
 import uuid
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEXES = {}
+INDEXED_VALUES = {}
 
 
 class Base:
-    """Base class for objects"""
+    """Base class for objects
+
+    Attributes:
+        INDEXED_ATTRIBUTES (Tuple[str, ...]): Attributes with a secondary
+         index, maintained on save/remove and on assignment to a stored
+         object, and used by search.
+    """
+    INDEXED_ATTRIBUTES: Tuple[str, ...] = ()
 
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize a Base instance
@@ -27,6 +38,7 @@ class Base:
         class_name = str(self.__class__.__name__)
         if DATA.get(class_name) is None:
             DATA[class_name] = {}
+            self.__class__._reset_indexes()
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
@@ -43,6 +55,20 @@ class Base:
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value):
+        """Set an attribute, and keep the secondary indexes current when
+        an indexed attribute of a stored object changes
+
+        Args:
+            name (str): The attribute name.
+            value: The new value.
+        """
+        super().__setattr__(name, value)
+        if name in self.INDEXED_ATTRIBUTES:
+            objects = DATA.get(self.__class__.__name__, {})
+            if objects.get(self.__dict__.get('id')) is self:
+                self.__class__._index(self)
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """Check equality
 
@@ -84,13 +110,67 @@ class Base:
         class_name = cls.__name__
         file_path = f".db_{class_name}.json"
         DATA[class_name] = {}
+        cls._reset_indexes()
         if not path.exists(file_path):
             return
 
         with open(file_path, 'r') as f:
             objs_json = json.load(f)
             for obj_id, obj_json in objs_json.items():
-                DATA[class_name][obj_id] = cls(**obj_json)
+                obj = cls(**obj_json)
+                DATA[class_name][obj_id] = obj
+                cls._index(obj)
+
+    @classmethod
+    def _reset_indexes(cls):
+        """Empty the secondary indexes of this type"""
+        class_name = cls.__name__
+        INDEXES[class_name] = {key: {} for key in cls.INDEXED_ATTRIBUTES}
+        INDEXED_VALUES[class_name] = {}
+
+    @classmethod
+    def _index(cls, obj: TypeVar('Base')):
+        """Add an object to the secondary indexes of this type
+
+        An attribute holding an unhashable value cannot be indexed, so
+        its index is dropped and searches on it scan every object.
+
+        Args:
+            obj: The object to index.
+        """
+        class_name = cls.__name__
+        indexes = INDEXES[class_name]
+        values = {key: getattr(obj, key, None) for key in indexes}
+        if INDEXED_VALUES[class_name].get(obj.id) == values:
+            return
+        cls._unindex(obj.id)
+        for key, value in values.items():
+            try:
+                indexes[key].setdefault(value, {})[obj.id] = None
+            except TypeError:
+                del indexes[key]
+        INDEXED_VALUES[class_name][obj.id] = values
+
+    @classmethod
+    def _unindex(cls, obj_id: str):
+        """Remove an object from the secondary indexes of this type
+
+        Args:
+            obj_id (str): The ID of the object.
+        """
+        class_name = cls.__name__
+        values = INDEXED_VALUES[class_name].pop(obj_id, None)
+        if values is None:
+            return
+        for key, value in values.items():
+            index = INDEXES[class_name].get(key)
+            if index is None:
+                continue
+            ids = index.get(value)
+            if ids is not None:
+                ids.pop(obj_id, None)
+                if not ids:
+                    del index[value]
 
     @classmethod
     def save_to_file(cls):
@@ -109,6 +189,7 @@ class Base:
         class_name = self.__class__.__name__
         self.updated_at = datetime.utcnow()
         DATA[class_name][self.id] = self
+        self.__class__._index(self)
         self.__class__.save_to_file()
 
     def remove(self):
@@ -116,6 +197,7 @@ class Base:
         class_name = self.__class__.__name__
         if DATA[class_name].get(self.id) is not None:
             del DATA[class_name][self.id]
+            self.__class__._unindex(self.id)
             self.__class__.save_to_file()
 
     @classmethod
@@ -135,10 +217,74 @@ class Base:
         class_name = cls.__name__
         return DATA[class_name].get(id)
 
+    @classmethod
+    def iter_all(cls) -> Iterator[TypeVar('Base')]:
+        """Iterate lazily over all objects, without copying them
+
+        A save or remove from another thread resizes the objects under
+        the iteration; it then starts over, skipping the objects already
+        returned.
+
+        Returns:
+            Iterator[Base]: The objects, in storage order.
+        """
+        seen = set()
+        while True:
+            try:
+                for obj_id, obj in DATA[cls.__name__].items():
+                    if obj_id not in seen:
+                        seen.add(obj_id)
+                        yield obj
+                return
+            except RuntimeError:
+                continue
+
+    @classmethod
+    def page(cls, cursor: str = None, limit: int = None,
+             offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Return a page of objects ordered by ID
+
+        Without cursor, limit or offset, every object is returned lazily
+        in storage order. Otherwise the objects are ordered by ID, and a
+        limit keeps only the first offset + limit of them in a heap.
+
+        Args:
+            cursor (str): The ID after which the page starts.
+            limit (int): The maximum number of objects.
+            offset (int): The number of objects to skip.
+
+        Returns:
+            Iterator[Base]: The objects of the page.
+        """
+        objects = cls.iter_all()
+        if cursor is None and limit is None and not offset:
+            return objects
+        if cursor is not None:
+            objects = (obj for obj in objects if obj.id > cursor)
+        if limit is None:
+            ordered = sorted(objects, key=lambda obj: obj.id)
+        else:
+            ordered = heapq.nsmallest(offset + limit, objects,
+                                      key=lambda obj: obj.id)
+        return islice(ordered, offset, None)
+
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
-        """Search all objects with matching attributes"""
+        """Search all objects with matching attributes
+
+        Indexed attributes narrow the search to the intersection of their
+        index entries; the remaining attributes are checked on those
+        candidates only.
+
+        Args:
+            attributes (dict): The attribute values to match.
+
+        Returns:
+            list: The matching objects.
+        """
         class_name = cls.__name__
+        objects = DATA[class_name]
+        indexes = INDEXES.get(class_name, {})
 
         def _search(obj):
             if not attributes:
@@ -148,4 +294,17 @@ class Base:
                     return False
             return True
 
-        return list(filter(_search, DATA[class_name].values()))
+        matches = []
+        for k, v in attributes.items():
+            if k not in indexes:
+                continue
+            try:
+                matches.append(indexes[k].get(v, {}))
+            except TypeError:
+                continue
+        if not matches:
+            return list(filter(_search, objects.values()))
+        matches.sort(key=len)
+        candidates = (objects[obj_id] for obj_id in matches[0]
+                      if all(obj_id in ids for ids in matches[1:]))
+        return list(filter(_search, candidates))
@@ -7,6 +7,7 @@ from models.base import Base
 
 class User(Base):
     """User class for managing user objects"""
+    INDEXED_ATTRIBUTES = ('email',)
 
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize a User instance
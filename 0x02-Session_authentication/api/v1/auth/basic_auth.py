@@ -70,13 +70,13 @@ class BasicAuth(Auth):
         """
         if type(email) == str and type(password) == str:
             try:
-                users = User.search({'email': email})
+                user = User.first({'email': email})
             except Exception:
                 return None
-            if len(users) <= 0:
+            if user is None:
                 return None
-            if users[0].is_valid_password(password):
-                return users[0]
+            if user.is_valid_password(password):
+                return user
         return None
 
     def current_user(self, request=None) -> TypeVar('User'):
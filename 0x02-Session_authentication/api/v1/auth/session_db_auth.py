@@ -45,17 +45,17 @@ class SessionDBAuth(SessionExpAuth):
             str: The user ID associated with the session ID.
         """
         try:
-            sessions = UserSession.search({'session_id': session_id})
+            session = UserSession.first({'session_id': session_id})
         except Exception:
             return None
-        if len(sessions) <= 0:
+        if session is None:
             return None
         current_time = datetime.now()
         time_span = timedelta(seconds=self.session_duration)
-        expiration_time = sessions[0].created_at + time_span
+        expiration_time = session.created_at + time_span
         if expiration_time < current_time:
             return None
-        return sessions[0].user_id
+        return session.user_id
 
     def destroy_session(self, request=None) -> bool:
         """Destroys an authenticated session.
@@ -69,10 +69,10 @@ class SessionDBAuth(SessionExpAuth):
         """
         session_id = self.session_cookie(request)
         try:
-            sessions = UserSession.search({'session_id': session_id})
+            session = UserSession.first({'session_id': session_id})
         except Exception:
             return False
-        if len(sessions) <= 0:
+        if session is None:
             return False
-        sessions[0].remove()
+        session.remove()
         return True
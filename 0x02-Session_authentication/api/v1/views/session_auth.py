@@ -24,15 +24,15 @@ def login() -> Tuple[str, int]:
     if password is None or len(password.strip()) == 0:
         return jsonify({"error": "password missing"}), 400
     try:
-        users = User.search({'email': email})
+        user = User.first({'email': email})
     except Exception:
         return jsonify(not_found_res), 404
-    if len(users) <= 0:
+    if user is None:
         return jsonify(not_found_res), 404
-    if users[0].is_valid_password(password):
+    if user.is_valid_password(password):
         from api.v1.app import auth
-        session_id = auth.create_session(getattr(users[0], 'id'))
-        response = jsonify(users[0].to_json())
+        session_id = auth.create_session(getattr(user, 'id'))
+        response = jsonify(user.to_json())
         response.set_cookie(os.getenv("SESSION_NAME"), session_id)
         return response
     return jsonify({"error": "wrong password"}), 401
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark the JSON codec of the models.
+
+Writes a .db_User.json of N users in a temporary directory and reports
+the time User.load_from_file takes to load it, the to_json throughput
+and the time User.save_to_file takes to write it back, next to the
+strftime/strptime and json module path the models used before the
+codec.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+from models.base import TIMESTAMP_FORMAT, get_storage
+from models.codec import attribute_names
+from models.user import User
+
+
+def reference_to_json(obj: User) -> dict:
+    """Convert an object to a JSON dictionary as Base.to_json did.
+    """
+    result = {}
+    for key in attribute_names(obj.__class__):
+        value = getattr(obj, key)
+        if type(value) is datetime:
+            result[key] = value.strftime(TIMESTAMP_FORMAT)
+        else:
+            result[key] = value
+    return result
+
+
+def reference_load(file_path: str) -> list:
+    """Load a .db_User.json as Base.load_from_file did: json module,
+    then one strptime per timestamp. The objects are built without
+    User.__init__, which parses the timestamps with the codec.
+    """
+    objects = []
+    with open(file_path, 'r') as file:
+        for obj_json in json.load(file).values():
+            obj = object.__new__(User)
+            for key, value in obj_json.items():
+                if key in User.TIMESTAMP_ATTRIBUTES:
+                    value = datetime.strptime(value, TIMESTAMP_FORMAT)
+                setattr(obj, key, value)
+            objects.append(obj)
+    return objects
+
+
+def reference_save(file_path: str, users: list):
+    """Save users to a .db_User.json as Base.save_to_file did.
+    """
+    with open(file_path, 'w') as file:
+        json.dump({user.id: reference_to_json(user) for user in users}, file)
+
+
+def timed(target: Callable[[], object], repeat: int) -> float:
+    """Return the best time of `repeat` runs of a target, in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        target()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int) -> Dict:
+    """Run every benchmark case in a temporary directory.
+
+    Args:
+        count (int): Number of users.
+        repeat (int): Runs per case; the best one is reported.
+
+    Returns:
+        Dict: The report.
+    """
+    os.environ['MODEL_STORAGE'] = 'file'
+    os.environ['MODEL_DURABILITY'] = 'shutdown'
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            storage = get_storage()
+            User.load_from_file()
+            objects = storage.objects(User)
+            for i in range(count):
+                user = User(email=f"user{i}@example.com", first_name="First",
+                            last_name="Last", _password="0" * 64)
+                objects[user.id] = user
+            users = list(objects.values())
+            User.save_to_file()
+            file_path = ".db_User.json"
+            cases = {
+                'load_from_file': User.load_from_file,
+                'reference_load': lambda: reference_load(file_path),
+                'to_json': lambda: [user.to_json() for user in users],
+                'reference_to_json': lambda: [reference_to_json(user)
+                                              for user in users],
+                'save_to_file': User.save_to_file,
+                'reference_save': lambda: reference_save(file_path, users),
+            }
+            results = []
+            for name, target in cases.items():
+                seconds = timed(target, repeat)
+                results.append({'case': name, 'seconds': seconds,
+                                'objects_per_sec': count / seconds})
+            file_bytes = os.path.getsize(file_path)
+        finally:
+            os.chdir(cwd)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'objects': count,
+        'file_bytes': file_bytes,
+        'results': results,
+    }
+
+
+def main():
+    """Main entry point for the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the JSON "
+                                                 "codec of the models.")
+    parser.add_argument('--objects', type=int, default=100000,
+                        help="users in the benchmark file")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per case, the best one is reported")
+    args = parser.parse_args()
+    json.dump(run(args.objects, args.repeat), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark the memory held by model objects.
+
+Builds N User and N UserSession objects in a dict keyed by ID, the way
+the file storage holds them, and reports the bytes per object measured by
+tracemalloc, next to the same attributes held in a per-instance
+__dict__ as the models did before they were slotted.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from models.user import User
+from models.user_session import UserSession
+
+
+class DictModel():
+    """Object holding its attributes in a __dict__.
+    """
+
+    def __init__(self, model):
+        """Copy the attributes of a model object.
+        """
+        for key, value in model.to_json(True).items():
+            setattr(self, key, value)
+        self.created_at = model.created_at
+        self.updated_at = model.updated_at
+
+
+def measure(factory: Callable[[int], object], count: int) -> Dict:
+    """Measure the memory of `count` objects built by a factory.
+
+    Args:
+        factory (Callable[[int], object]): Builds the i-th object.
+        count (int): Number of objects.
+
+    Returns:
+        Dict: The bytes per object, with and without attribute values.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = {}
+    for i in range(count):
+        obj = factory(i)
+        objects[obj.id] = obj
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sample = next(iter(objects.values()))
+    size = sys.getsizeof(sample)
+    if hasattr(sample, '__dict__'):
+        size += sys.getsizeof(sample.__dict__)
+    return {'bytes_per_object': (after - before) / count,
+            'instance_bytes': size}
+
+
+def run(count: int) -> Dict:
+    """Measure every model, slotted and dict-backed.
+
+    Args:
+        count (int): Number of objects per case.
+
+    Returns:
+        Dict: The report.
+    """
+    def user(i):
+        return User(email=f"user{i}@example.com", first_name="First",
+                    last_name="Last", _password="0" * 64)
+
+    def user_session(i):
+        return UserSession(user_id=f"user{i}", session_id=f"session{i}")
+
+    results = []
+    for name, factory in (('User', user), ('UserSession', user_session)):
+        for layout, build in (('slots', factory),
+                              ('dict', lambda i: DictModel(factory(i)))):
+            result = measure(build, count)
+            result.update({'model': name, 'layout': layout})
+            results.append(result)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'objects': count,
+        'results': results,
+    }
+
+
+def main():
+    """Main entry point for the script.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the memory "
+                                                 "of model objects.")
+    parser.add_argument('--objects', type=int, default=1000000,
+                        help="objects per benchmark case")
+    args = parser.parse_args()
+    json.dump(run(args.objects), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,141 @@
 #!/usr/bin/env python3
 """Base module for the API.
 """
-import json
+import os
 import uuid
-from os import path
 from datetime import datetime
-from typing import TypeVar, List, Iterable
+from types import MemberDescriptorType
+from typing import TypeVar, List, Iterator, Tuple
+
+from models.codec import TIMESTAMP_FORMAT, get_codec, parse_timestamp
+from models.file_storage import FileStorage
+from models.shared_storage import SharedFileStorage
+from models.sqlite_storage import SQLiteStorage
+from models.storage import Storage, parse_conditions
+
+STORAGE_BACKENDS = {
+    'file': FileStorage,
+    'journal': lambda: FileStorage(journal=True),
+    'shared': SharedFileStorage,
+    'sqlite': SQLiteStorage,
+}
+STORAGES = {}
+
+
+def storage_mode() -> str:
+    """Return the storage mode of the models, from MODEL_STORAGE.
+
+    "file" holds the objects in memory and rewrites the whole file of a
+    type on each save/remove, "journal" appends one record per
+    save/remove to a journal that is compacted into the file once it
+    holds JOURNAL_MAX_RECORDS records, "shared" is "journal" kept
+    coherent between several processes with file locks, and "sqlite"
+    keeps the objects in an SQLite database instead of memory.
+    """
+    return os.getenv('MODEL_STORAGE', 'file')
+
+
+def get_storage() -> Storage:
+    """Return the storage backend of the current storage mode.
+    """
+    mode = storage_mode()
+    if mode not in STORAGES:
+        if mode not in STORAGE_BACKENDS:
+            raise ValueError(f"unknown storage mode: {mode}")
+        STORAGES[mode] = STORAGE_BACKENDS[mode]()
+    return STORAGES[mode]
+
+
+def indexed_attribute(name: str, slot=None) -> property:
+    """Return the property of an indexed attribute, stored in its slot
+    or in the __dict__ of the object. Assigning it again after its first
+    value lets the storage update its indexes, so that an object changed
+    in memory is found by its current value.
+
+    Args:
+        name (str): The attribute name.
+        slot (member_descriptor): The slot holding the value, if any.
+
+    Returns:
+        property: The property to set on the class.
+    """
+    if slot is not None:
+        get_value = slot.__get__
+        delete_value = slot.__delete__
+        assign = slot.__set__
+    else:
+        def get_value(obj):
+            try:
+                return obj.__dict__[name]
+            except KeyError:
+                raise AttributeError(name) from None
+
+        def delete_value(obj):
+            get_value(obj)
+            del obj.__dict__[name]
+
+        def assign(obj, value):
+            obj.__dict__[name] = value
+
+    def set_value(obj, value):
+        try:
+            get_value(obj)
+        except AttributeError:
+            assign(obj, value)
+            return
+        assign(obj, value)
+        get_storage().reindex(obj)
 
-TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+    return property(get_value, set_value, delete_value)
 
 
 class Base():
     """Base class for API models.
+
+    Models store their attributes in __slots__ so that millions of them
+    fit in memory; a subclass without __slots__ gets a __dict__ and any
+    attribute, as before.
+
+    Attributes:
+        INDEXED_ATTRIBUTES (Tuple[str, ...]): Attributes with a secondary
+         index in the storage, used by search and kept current when they
+         are assigned.
+        TIMESTAMP_ATTRIBUTES (Tuple[str, ...]): Slotted attributes holding
+         a datetime, stored as TIMESTAMP_FORMAT strings.
+        JOURNAL_MAX_RECORDS (int): Number of journal records after which
+         the journal is compacted into the file.
     """
+    __slots__ = ('id', 'created_at', 'updated_at')
+    INDEXED_ATTRIBUTES: Tuple[str, ...] = ()
+    TIMESTAMP_ATTRIBUTES: Tuple[str, ...] = ('created_at', 'updated_at')
+    JOURNAL_MAX_RECORDS = 1000
 
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize a Base instance.
         """
-        class_name = str(self.__class__.__name__)
-        if DATA.get(class_name) is None:
-            DATA[class_name] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
+    def __init_subclass__(cls, **kwargs):
+        """Turn the INDEXED_ATTRIBUTES of a subclass into properties that
+        keep the storage indexes current, see indexed_attribute.
+        """
+        super().__init_subclass__(**kwargs)
+        for name in cls.INDEXED_ATTRIBUTES:
+            descriptor = getattr(cls, name, None)
+            if type(descriptor) is property:
+                continue
+            slot = descriptor if type(descriptor) is MemberDescriptorType \
+                else None
+            setattr(cls, name, indexed_attribute(name, slot))
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """Equality comparison for Base objects.
         """
@@ -46,92 +148,78 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """Convert the object to a JSON dictionary.
         """
-        result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
-            else:
-                result[key] = value
-        return result
+        return get_codec(self.__class__).to_dict(self, for_serialization)
 
     @classmethod
     def load_from_file(cls):
-        """Load all objects from file.
+        """Load all objects from the storage.
         """
-        class_name = cls.__name__
-        file_path = f".db_{class_name}.json"
-        DATA[class_name] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as file:
-            objs_json = json.load(file)
-            for obj_id, obj_json in objs_json.items():
-                DATA[class_name][obj_id] = cls(**obj_json)
+        get_storage().load(cls)
 
     @classmethod
     def save_to_file(cls):
-        """Save all objects to file.
+        """Save all pending changes to the storage.
         """
-        class_name = cls.__name__
-        file_path = f".db_{class_name}.json"
-        objs_json = {}
-        for obj_id, obj in DATA[class_name].items():
-            objs_json[obj_id] = obj.to_json(True)
-
-        with open(file_path, 'w') as file:
-            json.dump(objs_json, file)
+        get_storage().flush(cls)
 
     def save(self):
         """Save the current object.
         """
-        class_name = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[class_name][self.id] = self
-        self.__class__.save_to_file()
+        get_storage().save(self)
 
     def remove(self):
         """Remove the object.
         """
-        class_name = self.__class__.__name__
-        if DATA[class_name].get(self.id) is not None:
-            del DATA[class_name][self.id]
-            self.__class__.save_to_file()
+        get_storage().remove(self)
 
     @classmethod
     def count(cls) -> int:
         """Count all objects of this type.
         """
-        class_name = cls.__name__
-        return len(DATA[class_name].keys())
+        return get_storage().count(cls)
 
     @classmethod
-    def all(cls) -> Iterable[TypeVar('Base')]:
-        """Return all objects of this type.
+    def all(cls) -> Iterator[TypeVar('Base')]:
+        """Iterate over all objects of this type.
         """
-        return cls.search()
+        return cls.query()
 
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """Return one object by ID.
         """
-        class_name = cls.__name__
-        return DATA[class_name].get(id)
+        return get_storage().get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """Search all objects with matching attributes.
         """
-        class_name = cls.__name__
+        return list(cls.query(attributes))
 
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for key, value in attributes.items():
-                if getattr(obj, key) != value:
-                    return False
-            return True
+    @classmethod
+    def query(cls, attributes: dict = {}, order_by: str = None,
+              limit: int = None, offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Iterate lazily over the objects matching query attributes.
+
+        Args:
+            attributes (dict): Attribute names, optionally suffixed with
+             an operator such as "__prefix", "__in" or "__gte" (see
+             models.storage.parse_conditions), and their values.
+            order_by (str): Attribute to sort by, descending when
+             prefixed with "-".
+            limit (int): Maximum number of objects.
+            offset (int): Number of matching objects to skip.
+
+        Returns:
+            Iterator[Base]: The matching objects.
+        """
+        conditions = parse_conditions(cls, attributes)
+        return get_storage().query(cls, conditions, order_by, limit, offset)
 
-        return list(filter(_search, DATA[class_name].values()))
+    @classmethod
+    def first(cls, attributes: dict = {},
+              order_by: str = None) -> TypeVar('Base'):
+        """Return the first object matching query attributes, or None.
+        """
+        return next(cls.query(attributes, order_by, 1), None)
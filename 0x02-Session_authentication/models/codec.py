@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""JSON codecs of the models, precompiled per type.
+"""
+import json
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Iterable, Tuple, TypeVar
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def format_timestamp(value: datetime) -> str:
+    """Format a datetime with TIMESTAMP_FORMAT.
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(timespec='seconds')
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a datetime formatted with TIMESTAMP_FORMAT.
+    """
+    if len(value) == 19 and value[10] == 'T':
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+@lru_cache(maxsize=None)
+def attribute_names(cls: type) -> Tuple[str, ...]:
+    """Return the slotted attributes of a model type, base classes first.
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots
+                     if name not in ('__dict__', '__weakref__'))
+    return tuple(names)
+
+
+@lru_cache(maxsize=1)
+def _orjson():
+    """Return the orjson module, or None if it is not installed.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+class Codec():
+    """Converts the objects of one model type to and from JSON.
+
+    The slotted attributes of the type are read with one precompiled
+    getter, and its TIMESTAMP_ATTRIBUTES are formatted and parsed
+    without strftime/strptime. Attributes held in a __dict__ are
+    converted one by one, as Base.to_json did.
+    """
+
+    def __init__(self, cls: type):
+        """Compile the codec of a type.
+
+        Args:
+            cls (type): The model type.
+        """
+        self.cls = cls
+        self.fields = attribute_names(cls)
+        self.private_fields = tuple(key for key in self.fields
+                                    if key[0] == '_')
+        self.timestamp_fields = tuple(key for key in self.fields
+                                      if key in cls.TIMESTAMP_ATTRIBUTES)
+        self.has_dict = cls.__dictoffset__ != 0
+        self._values = attrgetter(*self.fields) if len(self.fields) > 1 \
+            else None
+
+    def to_dict(self, obj: TypeVar('Base'),
+                for_serialization: bool = False) -> dict:
+        """Convert an object to a JSON dictionary.
+
+        Args:
+            obj (Base): The object.
+            for_serialization (bool): Whether to keep the attributes
+             starting with "_".
+
+        Returns:
+            dict: The JSON dictionary.
+        """
+        try:
+            result = dict(zip(self.fields, self._values(obj)))
+        except (AttributeError, TypeError):
+            result = {}
+            for key in self.fields:
+                value = getattr(obj, key, result)
+                if value is not result:
+                    result[key] = value
+        for key in self.timestamp_fields:
+            value = result.get(key)
+            if type(value) is datetime:
+                result[key] = format_timestamp(value)
+        if self.has_dict:
+            for key, value in getattr(obj, '__dict__', {}).items():
+                if type(value) is datetime:
+                    value = format_timestamp(value)
+                result[key] = value
+        if not for_serialization:
+            for key in self.private_fields:
+                result.pop(key, None)
+            if self.has_dict:
+                for key in [key for key in result if key[0] == '_']:
+                    del result[key]
+        return result
+
+    def from_dict(self, data: dict) -> TypeVar('Base'):
+        """Build an object from a JSON dictionary.
+        """
+        return self.cls(**data)
+
+    def dumps(self, obj: TypeVar('Base')) -> bytes:
+        """Encode one object, with its private attributes, to JSON bytes.
+        """
+        return encode(self.to_dict(obj, True))
+
+    def loads(self, data: bytes) -> TypeVar('Base'):
+        """Decode one object from JSON bytes or text.
+        """
+        return self.cls(**decode(data))
+
+    def dumps_all(self, objects: Iterable[TypeVar('Base')]) -> bytes:
+        """Encode objects, with their private attributes, to the JSON
+        bytes of a .db_<Class>.json file: an object mapping IDs to the
+        JSON dictionaries of the objects.
+        """
+        return encode({obj.id: self.to_dict(obj, True) for obj in objects})
+
+    def loads_all(self, data: bytes) -> Dict[str, TypeVar('Base')]:
+        """Decode the objects of a .db_<Class>.json file, by ID.
+        """
+        cls = self.cls
+        return {obj_id: cls(**obj_json)
+                for obj_id, obj_json in decode(data).items()}
+
+
+@lru_cache(maxsize=None)
+def get_codec(cls: type) -> Codec:
+    """Return the codec of a model type.
+    """
+    return Codec(cls)
+
+
+def encode(data) -> bytes:
+    """Encode JSON data to bytes, with orjson if it is installed.
+    """
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(data).encode()
+
+
+def decode(data):
+    """Decode JSON bytes or text, with orjson if it is installed.
+    """
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
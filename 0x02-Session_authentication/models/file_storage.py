@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""In-memory storage of the models, persisted to JSON files.
+"""
+import atexit
+import heapq
+import os
+import shutil
+import signal
+import tempfile
+import threading
+from itertools import islice
+from os import path
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from models.codec import decode, encode, get_codec
+from models.storage import Condition, Storage, matches, sort_key
+
+# os.umask can only be read by setting it, which races with the other
+# threads creating files, so it is read once, at import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def durability() -> str:
+    """Return when the file of a type is written, from MODEL_DURABILITY.
+
+    "sync" writes it on each save/remove, "interval" lets a background
+    thread write it once MODEL_FLUSH_INTERVAL_MS milliseconds passed or
+    MODEL_FLUSH_MAX_CHANGES changes piled up, and "shutdown" writes it
+    when the process exits only. Pending changes are always written on
+    exit and on SIGTERM.
+    """
+    return os.getenv('MODEL_DURABILITY', 'sync')
+
+
+class WriteBehind():
+    """Coalesce the file writes of the types changed since the last
+    flush into one write per type.
+    """
+
+    def __init__(self, write: Callable[[type], None]):
+        """Initialize an idle flusher.
+
+        Args:
+            write (Callable[[type], None]): Writes the file of a type.
+        """
+        self._write = write
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._hooked = False
+
+    def mark(self, cls: type):
+        """Record a change of a type, to be written by a later flush.
+        """
+        self.install_hooks()
+        with self._lock:
+            self._dirty[cls] = self._dirty.get(cls, 0) + 1
+            if durability() != 'interval':
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="model-flusher",
+                                                daemon=True)
+                self._thread.start()
+            max_changes = int(os.getenv('MODEL_FLUSH_MAX_CHANGES', 100))
+            if sum(self._dirty.values()) >= max_changes:
+                self._wake.notify()
+
+    def flush(self):
+        """Write the file of every changed type.
+        """
+        with self._flush_lock:
+            with self._lock:
+                dirty = list(self._dirty)
+                self._dirty.clear()
+            for cls in dirty:
+                self._write(cls)
+
+    def _run(self):
+        """Flush every MODEL_FLUSH_INTERVAL_MS milliseconds, or sooner
+        when mark asks for it.
+        """
+        interval = int(os.getenv('MODEL_FLUSH_INTERVAL_MS', 100)) / 1000
+        while True:
+            with self._wake:
+                self._wake.wait(interval)
+            self.flush()
+
+    def install_hooks(self):
+        """Flush at interpreter exit, and turn a SIGTERM left to its
+        default action into a normal exit so that the flush runs.
+
+        The signal handler can only be installed from the main thread;
+        it is installed by the first call made there.
+        """
+        if not self._hooked:
+            self._hooked = True
+            atexit.register(self.flush)
+        try:
+            if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, _exit_on_signal)
+        except ValueError:
+            pass
+
+
+def _exit_on_signal(signum, frame):
+    """Exit normally on a signal, running the atexit hooks.
+    """
+    raise SystemExit(128 + signum)
+
+
+class FileStorage(Storage):
+    """Objects held in memory and written to .db_<Class>.json.
+
+    Without a journal, the whole file of a type is rewritten on each
+    save/remove, or later as durability() says. With a journal, each
+    save/remove appends one record to .db_<Class>.journal, which is
+    compacted into the file once it holds cls.JOURNAL_MAX_RECORDS
+    records. Changes of a type are made under its thread lock, so that
+    the objects, the journal and its compaction stay in step.
+    """
+
+    def __init__(self, journal: bool = False):
+        """Initialize an empty storage.
+
+        Args:
+            journal (bool): Whether to append save/remove records to a
+             journal instead of rewriting the file.
+        """
+        self.journal = journal
+        self.data = {}
+        self.indexes = {}
+        self.indexed_values = {}
+        self.journal_sizes = {}
+        self.write_behind = WriteBehind(self.flush)
+        self._thread_locks = {}
+        self._thread_locks_lock = threading.Lock()
+
+    def thread_lock(self, cls: type) -> threading.RLock:
+        """Return the lock of a type against the other threads.
+        """
+        with self._thread_locks_lock:
+            return self._thread_locks.setdefault(cls.__name__,
+                                                 threading.RLock())
+
+    def objects(self, cls: type) -> dict:
+        """Return the objects of a type by ID.
+        """
+        class_name = cls.__name__
+        if self.data.get(class_name) is None:
+            self.data[class_name] = {}
+            self._reset_indexes(cls)
+        return self.data[class_name]
+
+    def load(self, cls: type):
+        """Load all objects from file, then replay the journal.
+
+        A last journal record cut short by a crash is skipped, and the
+        journal is compacted so that the next record does not land on
+        the same line.
+        """
+        if durability() != 'sync':
+            self.write_behind.install_hooks()
+        with self.thread_lock(cls):
+            _, torn = self._load(cls)
+            if torn:
+                self._write_file(cls)
+
+    def _load(self, cls: type) -> Tuple[int, bool]:
+        """Load all objects from file, then replay the journal.
+
+        Returns:
+            Tuple[int, bool]: The offset where the replay stopped, and
+             whether it stopped at a record cut short.
+        """
+        class_name = cls.__name__
+        file_path = f".db_{class_name}.json"
+        self.data[class_name] = {}
+        self.journal_sizes[class_name] = 0
+        self._reset_indexes(cls)
+        if path.exists(file_path):
+            with open(file_path, 'rb') as file:
+                objects = get_codec(cls).loads_all(file.read())
+            self.data[class_name] = objects
+            for obj in objects.values():
+                self._index(obj)
+        return self._replay_journal(cls)
+
+    def _replay_journal(self, cls: type,
+                        offset: int = 0) -> Tuple[int, bool]:
+        """Apply the records of the journal to the loaded objects.
+
+        Replaying a record twice leaves the same state, so a journal
+        that outlived its compaction is harmless. The replay stops at a
+        last record without its newline; other unreadable records are
+        skipped.
+
+        Args:
+            cls (type): The model type.
+            offset (int): Offset of the first record to apply.
+
+        Returns:
+            Tuple[int, bool]: The offset where the replay stopped, and
+             whether it stopped at a record cut short.
+        """
+        class_name = cls.__name__
+        journal_path = f".db_{class_name}.journal"
+        if not path.exists(journal_path):
+            return 0, False
+
+        torn = False
+        objects = self.objects(cls)
+        codec = get_codec(cls)
+        with open(journal_path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    torn = True
+                    break
+                offset += len(line)
+                try:
+                    record = decode(line)
+                except ValueError:
+                    continue
+                self.journal_sizes[class_name] = \
+                    self.journal_sizes.get(class_name, 0) + 1
+                obj_id = record.get('id')
+                if record.get('op') == 'save':
+                    obj = codec.from_dict(record['obj'])
+                    objects[obj_id] = obj
+                    self._index(obj)
+                elif objects.pop(obj_id, None) is not None:
+                    self._unindex(cls, obj_id)
+        return offset, torn
+
+    def _append_journal(self, op: str, obj: TypeVar('Base')):
+        """Append one save/remove record to the journal of a type, and
+        compact the journal once it holds JOURNAL_MAX_RECORDS records.
+        """
+        cls = obj.__class__
+        class_name = cls.__name__
+        record = {'op': op, 'id': obj.id}
+        if op == 'save':
+            record['obj'] = get_codec(cls).to_dict(obj, True)
+        journal_path = f".db_{class_name}.journal"
+        with open(journal_path, 'ab') as file:
+            file.write(encode(record) + b"\n")
+        size = self.journal_sizes.get(class_name, 0) + 1
+        self.journal_sizes[class_name] = size
+        if size >= cls.JOURNAL_MAX_RECORDS:
+            self._write_file(cls)
+
+    def _reset_indexes(self, cls: type):
+        """Empty the secondary indexes of a type.
+        """
+        class_name = cls.__name__
+        self.indexes[class_name] = {key: {}
+                                    for key in cls.INDEXED_ATTRIBUTES}
+        self.indexed_values[class_name] = {}
+
+    def _index(self, obj: TypeVar('Base')):
+        """Add an object to the secondary indexes of its type.
+
+        An attribute holding an unhashable value cannot be indexed, so
+        its index is dropped and searches on it scan every object.
+        """
+        cls = obj.__class__
+        class_name = cls.__name__
+        indexes = self.indexes[class_name]
+        values = {key: getattr(obj, key, None) for key in indexes}
+        if self.indexed_values[class_name].get(obj.id) == values:
+            return
+        self._unindex(cls, obj.id)
+        for key, value in values.items():
+            try:
+                indexes[key].setdefault(value, {})[obj.id] = None
+            except TypeError:
+                del indexes[key]
+        self.indexed_values[class_name][obj.id] = values
+
+    def reindex(self, obj: TypeVar('Base')):
+        """Update the secondary indexes after an indexed attribute of an
+        object changed in memory, if the object is the stored one.
+        """
+        cls = obj.__class__
+        objects = self.data.get(cls.__name__)
+        if objects is None or objects.get(getattr(obj, 'id', None)) is not obj:
+            return
+        with self.thread_lock(cls):
+            if objects.get(obj.id) is obj:
+                self._index(obj)
+
+    def _unindex(self, cls: type, obj_id: str):
+        """Remove an object from the secondary indexes of a type.
+        """
+        class_name = cls.__name__
+        values = self.indexed_values[class_name].pop(obj_id, None)
+        if values is None:
+            return
+        for key, value in values.items():
+            index = self.indexes[class_name].get(key)
+            if index is None:
+                continue
+            ids = index.get(value)
+            if ids is not None:
+                ids.pop(obj_id, None)
+                if not ids:
+                    del index[value]
+
+    def flush(self, cls: type):
+        """Save all objects of a type to file.
+        """
+        with self.thread_lock(cls):
+            self._write_file(cls)
+
+    def _write_file(self, cls: type):
+        """Save all objects of a type to file.
+
+        The file is written to a temporary file of its own next to its
+        final path, given the mode of the file it replaces (or the one
+        the umask gives a new file), and renamed over it, then the
+        journal it now covers is deleted. The caller holds the thread
+        lock of the type.
+        """
+        class_name = cls.__name__
+        file_path = f".db_{class_name}.json"
+        data = get_codec(cls).dumps_all(list(self.objects(cls).values()))
+
+        fd, temp_path = tempfile.mkstemp(dir=path.dirname(file_path) or '.',
+                                         prefix=f"{file_path}.",
+                                         suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            if path.exists(file_path):
+                shutil.copymode(file_path, temp_path)
+            else:
+                os.chmod(temp_path, 0o666 & ~_UMASK)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        journal_path = f".db_{class_name}.journal"
+        if path.exists(journal_path):
+            os.remove(journal_path)
+        self.journal_sizes[class_name] = 0
+
+    def save(self, obj: TypeVar('Base')):
+        """Store an object and persist the change.
+        """
+        with self.thread_lock(obj.__class__):
+            self.objects(obj.__class__)[obj.id] = obj
+            self._index(obj)
+            self._write('save', obj)
+
+    def remove(self, obj: TypeVar('Base')):
+        """Delete an object and persist the change.
+        """
+        cls = obj.__class__
+        with self.thread_lock(cls):
+            if self.objects(cls).pop(obj.id, None) is not None:
+                self._unindex(cls, obj.id)
+                self._write('remove', obj)
+
+    def _write(self, op: str, obj: TypeVar('Base')):
+        """Persist one save/remove as the journal setting and the
+        durability policy say.
+        """
+        if self.journal:
+            self._append_journal(op, obj)
+        elif durability() == 'sync':
+            self._write_file(obj.__class__)
+        else:
+            self.write_behind.mark(obj.__class__)
+
+    def count(self, cls: type) -> int:
+        """Count all objects of a type.
+        """
+        return len(self.objects(cls))
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """Return one object by ID.
+        """
+        return self.objects(cls).get(obj_id)
+
+    def query(self, cls: type, conditions: List[Condition],
+              order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Iterate over the objects matching query conditions.
+
+        Equality and "in" conditions on indexed attributes narrow the
+        query to the intersection of their index entries; the other
+        conditions are checked on those candidates only, one at a time,
+        so the scan stops early on a limit. Ordering with a limit keeps
+        only the first offset + limit objects.
+
+        An ordered or limited query scans the objects under the thread
+        lock of the type and keeps only what it returns. An unbounded
+        one takes a snapshot of the candidate IDs under the lock, and
+        resolves and checks the objects as the caller iterates, skipping
+        the ones removed meanwhile: the caller's iteration never runs
+        over dicts a writer may resize.
+        """
+        with self.thread_lock(cls):
+            objects = self.objects(cls)
+            indexes = self.indexes[cls.__name__]
+            buckets = []
+            for name, op, value in conditions:
+                if name not in indexes or op not in ('eq', 'in'):
+                    continue
+                try:
+                    if op == 'eq':
+                        buckets.append(indexes[name].get(value, {}))
+                    else:
+                        ids = {}
+                        for item in value:
+                            ids.update(indexes[name].get(item, {}))
+                        buckets.append(ids)
+                except TypeError:
+                    continue
+            if len(buckets) == 0:
+                candidate_ids = objects
+            else:
+                buckets.sort(key=len)
+                candidate_ids = (obj_id for obj_id in buckets[0]
+                                 if all(obj_id in ids
+                                        for ids in buckets[1:]))
+            if order_by is None and limit is None:
+                candidate_ids = list(candidate_ids)
+            else:
+                results = (obj for obj in map(objects.get, candidate_ids)
+                           if matches(obj, conditions))
+                if order_by is None:
+                    results = list(islice(results, offset + limit))
+                else:
+                    key = sort_key(order_by.lstrip('-'))
+                    reverse = order_by.startswith('-')
+                    if limit is None:
+                        results = sorted(results, key=key, reverse=reverse)
+                    else:
+                        pick = heapq.nlargest if reverse \
+                            else heapq.nsmallest
+                        results = pick(offset + limit, results, key=key)
+        if order_by is None and limit is None:
+            results = (obj for obj in map(objects.get, candidate_ids)
+                       if obj is not None and matches(obj, conditions))
+        return islice(results, offset,
+                      None if limit is None else offset + limit)
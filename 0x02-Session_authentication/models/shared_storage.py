@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""File storage of the models shared by several processes.
+"""
+import os
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple, TypeVar
+
+from models.file_storage import FileStorage
+from models.storage import Condition
+
+
+class SharedFileStorage(FileStorage):
+    """Journaled file storage kept coherent between processes.
+
+    Every process holds its own copy of the objects. Writes take an
+    exclusive advisory lock on .db_<Class>.lock, apply the records the
+    other processes appended since the last look, then append their own,
+    so that the changes of all processes merge object by object. Reads
+    compare the generation of the files with the last one seen, and
+    catch up under a shared lock when it moved.
+
+    The generation is the number of compactions, counted by the size of
+    the lock file which grows by one byte per compaction, and the size
+    of the journal. Both are read with one stat each.
+    """
+
+    def __init__(self):
+        """Initialize an empty storage.
+        """
+        super().__init__(journal=True)
+        self.generations = {}
+        self.offsets = {}
+
+    @contextmanager
+    def locked(self, cls: type, exclusive: bool):
+        """Hold the lock of a type, against the other threads and the
+        other processes.
+
+        Args:
+            cls (type): The model type.
+            exclusive (bool): Whether to exclude readers too.
+        """
+        import fcntl
+
+        with self.thread_lock(cls), \
+                open(f".db_{cls.__name__}.lock", 'ab') as file:
+            fcntl.flock(file.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def generation(cls: type) -> Tuple[int, int]:
+        """Return the generation of the files of a type: the number of
+        compactions and the size of the journal.
+        """
+        class_name = cls.__name__
+        try:
+            compactions = os.stat(f".db_{class_name}.lock").st_size
+        except FileNotFoundError:
+            compactions = 0
+        try:
+            journal_size = os.stat(f".db_{class_name}.journal").st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return compactions, journal_size
+
+    def _catch_up(self, cls: type) -> bool:
+        """Apply the changes made by other processes. The caller holds
+        the lock of the type.
+
+        A new compaction means another process rewrote the file and
+        emptied the journal, so everything is reloaded; otherwise only
+        the journal records past the last one applied are.
+
+        Returns:
+            bool: Whether the journal ends with a record cut short.
+        """
+        class_name = cls.__name__
+        compactions, journal_size = self.generation(cls)
+        known = self.generations.get(class_name)
+        if known == (compactions, journal_size):
+            return False
+        offset = self.offsets.get(class_name, 0)
+        if known is None or known[0] != compactions:
+            offset, torn = self._load(cls)
+        else:
+            offset, torn = self._replay_journal(cls, offset)
+        self.offsets[class_name] = offset
+        self.generations[class_name] = (compactions, offset)
+        return torn
+
+    def _seen(self, cls: type):
+        """Record the current files of a type as written by this process.
+        The caller holds the exclusive lock of the type.
+        """
+        class_name = cls.__name__
+        compactions, journal_size = self.generation(cls)
+        self.offsets[class_name] = journal_size
+        self.generations[class_name] = (compactions, journal_size)
+
+    def _write_file(self, cls: type):
+        """Save all objects of a type to file, and count the compaction.
+        The caller holds the exclusive lock of the type.
+        """
+        super()._write_file(cls)
+        with open(f".db_{cls.__name__}.lock", 'ab') as file:
+            file.write(b"\n")
+
+    def refresh(self, cls: type):
+        """Catch up with the other processes if the files of a type
+        changed since the last look.
+        """
+        known = self.generations.get(cls.__name__)
+        if known is not None and known == self.generation(cls):
+            return
+        with self.locked(cls, False):
+            self._catch_up(cls)
+
+    def load(self, cls: type):
+        """Load all objects from file, then replay the journal.
+        """
+        with self.locked(cls, True):
+            self.generations.pop(cls.__name__, None)
+            if self._catch_up(cls):
+                self._write_file(cls)
+                self._seen(cls)
+
+    def flush(self, cls: type):
+        """Compact the journal of a type into its file.
+        """
+        with self.locked(cls, True):
+            self._catch_up(cls)
+            self._write_file(cls)
+            self._seen(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """Store an object and append it to the journal.
+        """
+        cls = obj.__class__
+        with self.locked(cls, True):
+            if self._catch_up(cls):
+                self._write_file(cls)
+            super().save(obj)
+            self._seen(cls)
+
+    def remove(self, obj: TypeVar('Base')):
+        """Delete an object and append its removal to the journal.
+        """
+        cls = obj.__class__
+        with self.locked(cls, True):
+            if self._catch_up(cls):
+                self._write_file(cls)
+            super().remove(obj)
+            self._seen(cls)
+
+    def count(self, cls: type) -> int:
+        """Count all objects of a type.
+        """
+        self.refresh(cls)
+        return super().count(cls)
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """Return one object by ID.
+        """
+        self.refresh(cls)
+        return super().get(cls, obj_id)
+
+    def query(self, cls: type, conditions: List[Condition],
+              order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Iterate over the objects matching query conditions.
+        """
+        self.refresh(cls)
+        return super().query(cls, conditions, order_by, limit, offset)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""SQLite storage of the models.
+"""
+import os
+import threading
+from datetime import datetime
+from itertools import islice
+from os import path
+from typing import Iterator, List, Optional, Tuple, TypeVar
+
+from models.codec import decode, encode, format_timestamp, get_codec
+from models.storage import Condition, Storage, matches
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or index name for SQLite.
+    """
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def json_column(key: str) -> str:
+    """Return the SQL expression reading an attribute from the data
+    column. The JSON path is inlined so that the expression matches the
+    one of the index on that attribute.
+    """
+    json_path = '$."{}"'.format(key)
+    return "json_extract(data, '{}')".format(json_path.replace("'", "''"))
+
+
+def column(key: str) -> str:
+    """Return the SQL expression reading an attribute.
+    """
+    return "id" if key == 'id' else json_column(key)
+
+
+def sql_value(value):
+    """Return a value as SQLite compares it with the data column, or
+    raise TypeError if SQLite cannot compare it.
+    """
+    if type(value) is datetime:
+        return format_timestamp(value)
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    raise TypeError(type(value).__name__)
+
+
+def sql_condition(name: str, op: str,
+                  value) -> Optional[Tuple[str, list]]:
+    """Translate a query condition to an SQL clause and its parameters,
+    or return None if it can only be checked in Python.
+    """
+    expression = column(name)
+    try:
+        if op == 'eq':
+            return f"{expression} IS ?", [sql_value(value)]
+        if op == 'prefix':
+            if type(value) is not str or value[-1:] == chr(0x10FFFF):
+                return None
+            if value == '':
+                return f"{expression} >= ?", [value]
+            upper = value[:-1] + chr(ord(value[-1]) + 1)
+            clause = f"({expression} >= ? AND {expression} < ?)"
+            return clause, [value, upper]
+        if op == 'in':
+            items = [sql_value(item) for item in value]
+            values = [item for item in items if item is not None]
+            clause = "{} IN ({})".format(expression,
+                                         ", ".join("?" * len(values)))
+            if len(values) < len(items):
+                clause = f"({clause} OR {expression} IS NULL)"
+            return clause, values
+        if value is None:
+            return None
+        sign = {'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}[op]
+        return f"{expression} {sign} ?", [sql_value(value)]
+    except TypeError:
+        return None
+
+
+class SQLiteStorage(Storage):
+    """Objects stored in an SQLite database, MODEL_SQLITE_PATH
+    (".db_models.sqlite3" by default), and never held in memory.
+
+    Each type has a table of (id, data) rows, where data is the JSON of
+    obj.to_json(True), with an expression index on each of its
+    INDEXED_ATTRIBUTES and on created_at and updated_at. Each
+    connection belongs to one thread.
+    """
+
+    def __init__(self, db_path: str = None):
+        """Initialize the storage.
+
+        Args:
+            db_path (str): Path of the database, MODEL_SQLITE_PATH if
+             None.
+        """
+        self.db_path = db_path or os.getenv('MODEL_SQLITE_PATH',
+                                            '.db_models.sqlite3')
+        self._local = threading.local()
+        self._tables = set()
+
+    def connection(self):
+        """Return the connection of the current thread.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            import sqlite3
+
+            connection = sqlite3.connect(self.db_path, isolation_level=None,
+                                         timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def table(self, cls: type) -> str:
+        """Create the table and indexes of a type if needed, and return
+        the quoted table name.
+
+        A new table is filled from .db_<Class>.json when that file
+        exists, so that switching to SQLite keeps the stored objects.
+        """
+        class_name = cls.__name__
+        table = quote_identifier(class_name)
+        if class_name in self._tables:
+            return table
+        connection = self.connection()
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (class_name,)).fetchone()
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                           "(id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        keys = ('created_at', 'updated_at') + tuple(cls.INDEXED_ATTRIBUTES)
+        for key in dict.fromkeys(keys):
+            index = quote_identifier(f"{class_name}_{key}")
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {index} ON "
+                               f"{table} ({json_column(key)})")
+        file_path = f".db_{class_name}.json"
+        if exists is None and path.exists(file_path):
+            with open(file_path, 'rb') as file:
+                objs_json = decode(file.read())
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES (?, ?)",
+                    ((obj_id, encode(obj_json).decode())
+                     for obj_id, obj_json in objs_json.items()))
+        self._tables.add(class_name)
+        return table
+
+    def load(self, cls: type):
+        """Create the table of a type; objects are read on demand.
+        """
+        self.table(cls)
+
+    def flush(self, cls: type):
+        """Nothing to do: every save/remove is committed.
+        """
+        self.table(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """Insert or replace an object.
+        """
+        table = self.table(obj.__class__)
+        self.connection().execute(
+            f"INSERT OR REPLACE INTO {table} VALUES (?, ?)",
+            (obj.id, get_codec(obj.__class__).dumps(obj).decode()))
+
+    def remove(self, obj: TypeVar('Base')):
+        """Delete an object.
+        """
+        table = self.table(obj.__class__)
+        self.connection().execute(f"DELETE FROM {table} WHERE id = ?",
+                                  (obj.id,))
+
+    def count(self, cls: type) -> int:
+        """Count all objects of a type.
+        """
+        table = self.table(cls)
+        row = self.connection().execute(
+            f"SELECT COUNT(*) FROM {table}").fetchone()
+        return row[0]
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """Return one object by ID.
+        """
+        table = self.table(cls)
+        row = self.connection().execute(
+            f"SELECT data FROM {table} WHERE id = ?", (obj_id,)).fetchone()
+        if row is None:
+            return None
+        return get_codec(cls).loads(row[0])
+
+    def query(self, cls: type, conditions: List[Condition],
+              order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Iterate over the objects matching query conditions.
+
+        Conditions on values SQLite can compare run in SQL, using the
+        indexes, with the ordering, limit and offset. Other conditions
+        are checked on the rows SQL returns, and the limit and offset
+        are then applied to those. Rows are read lazily.
+        """
+        table = self.table(cls)
+        clauses = []
+        params = []
+        remaining = []
+        for condition in conditions:
+            clause = sql_condition(*condition)
+            if clause is None:
+                remaining.append(condition)
+            else:
+                clauses.append(clause[0])
+                params.extend(clause[1])
+        query = f"SELECT data FROM {table}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if order_by is not None:
+            query += f" ORDER BY {column(order_by.lstrip('-'))}"
+            if order_by.startswith('-'):
+                query += " DESC"
+        if not remaining and (limit is not None or offset):
+            query += " LIMIT ? OFFSET ?"
+            params.extend((-1 if limit is None else limit, offset))
+            limit, offset = None, 0
+        codec = get_codec(cls)
+        rows = self.connection().execute(query, params)
+        results = (obj for obj in (codec.loads(row[0]) for row in rows)
+                   if matches(obj, remaining))
+        return islice(results, offset,
+                      None if limit is None else offset + limit)
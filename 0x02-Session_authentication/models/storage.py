@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Storage interface of the models, and the conditions of its queries.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Iterator, List, Optional, Tuple, TypeVar
+
+from models.codec import parse_timestamp
+
+OPERATORS = ('eq', 'prefix', 'in', 'lt', 'lte', 'gt', 'gte')
+Condition = Tuple[str, str, Any]
+
+
+def parse_conditions(cls: type, attributes: dict) -> List[Condition]:
+    """Parse query attributes into (attribute, operator, value) tuples.
+
+    A key is an attribute name, optionally followed by "__" and one of
+    OPERATORS: "email" or "email__eq" match equal values,
+    "email__prefix" strings starting with the value, "id__in" values
+    in the given collection, and "created_at__gte" (or lt, lte, gt)
+    values in a range. Strings given for TIMESTAMP_ATTRIBUTES are parsed
+    as timestamps.
+
+    Args:
+        cls (type): The model type.
+        attributes (dict): The query attributes and their values.
+
+    Returns:
+        List[Condition]: The conditions.
+    """
+    conditions = []
+    for key, value in attributes.items():
+        name, _, op = key.partition('__')
+        op = op or 'eq'
+        if op not in OPERATORS:
+            raise ValueError(f"unknown query operator: {key}")
+        if name in cls.TIMESTAMP_ATTRIBUTES:
+            if op == 'in':
+                value = [parse_timestamp(item) if type(item) is str
+                         else item for item in value]
+            elif type(value) is str and op != 'prefix':
+                value = parse_timestamp(value)
+        elif op == 'in':
+            value = list(value)
+        conditions.append((name, op, value))
+    return conditions
+
+
+def matches(obj: TypeVar('Base'), conditions: List[Condition]) -> bool:
+    """Check an object against query conditions. Values that cannot be
+    compared with the condition do not match.
+    """
+    for name, op, expected in conditions:
+        value = getattr(obj, name)
+        try:
+            if op == 'eq':
+                matched = value == expected
+            elif op == 'prefix':
+                matched = type(value) is str and value.startswith(expected)
+            elif op == 'in':
+                matched = value in expected
+            elif op == 'lt':
+                matched = value is not None and value < expected
+            elif op == 'lte':
+                matched = value is not None and value <= expected
+            elif op == 'gt':
+                matched = value is not None and value > expected
+            else:
+                matched = value is not None and value >= expected
+        except TypeError:
+            matched = False
+        if not matched:
+            return False
+    return True
+
+
+def sort_key(name: str):
+    """Return a sort key reading an attribute, with None values first.
+    """
+    def key(obj):
+        value = getattr(obj, name)
+        return (value is not None, value)
+    return key
+
+
+class Storage(ABC):
+    """Storage backend of Base: holds the objects of every model type.
+
+    Base delegates load_from_file, save_to_file, save, remove, count,
+    get and its queries to the backend selected by MODEL_STORAGE.
+    """
+
+    @abstractmethod
+    def load(self, cls: type):
+        """Load the stored objects of a type.
+
+        Args:
+            cls (type): The model type.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def flush(self, cls: type):
+        """Write the pending changes of a type.
+
+        Args:
+            cls (type): The model type.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, obj: TypeVar('Base')):
+        """Store an object, replacing the one with the same ID.
+
+        Args:
+            obj (Base): The object to store.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, obj: TypeVar('Base')):
+        """Delete an object.
+
+        Args:
+            obj (Base): The object to delete.
+        """
+        raise NotImplementedError
+
+    def reindex(self, obj: TypeVar('Base')):
+        """Update the secondary indexes after an indexed attribute of an
+        object changed in memory. Nothing to do for a backend without
+        in-memory indexes.
+
+        Args:
+            obj (Base): The changed object, stored or not.
+        """
+
+    @abstractmethod
+    def count(self, cls: type) -> int:
+        """Count the objects of a type.
+
+        Args:
+            cls (type): The model type.
+
+        Returns:
+            int: The number of objects.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """Return one object by ID.
+
+        Args:
+            cls (type): The model type.
+            obj_id (str): The ID of the object.
+
+        Returns:
+            Base: The object, or None.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(self, cls: type, conditions: List[Condition],
+              order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0) -> Iterator[TypeVar('Base')]:
+        """Iterate over the objects matching query conditions.
+
+        Args:
+            cls (type): The model type.
+            conditions (List[Condition]): The conditions, as returned by
+             parse_conditions.
+            order_by (str): Attribute to sort by, descending when
+             prefixed with "-"; the storage order if None.
+            limit (int): Maximum number of objects, no limit if None.
+            offset (int): Number of matching objects to skip.
+
+        Returns:
+            Iterator[Base]: The matching objects, read lazily where the
+             backend can.
+        """
+        raise NotImplementedError